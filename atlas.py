@@ -0,0 +1,443 @@
+import sys
+import os
+import json
+import struct
+import hashlib
+
+
+# ===============================
+# ФОРМАТ АТЛАСА АНИМАЦИИ
+# ===============================
+# Один файл на анимацию вместо сотни PNG:
+#   MAGIC | длина заголовка (uint32 LE) | заголовок JSON | blob
+# В blob подряд лежат PNG-кадры, заголовок хранит для каждого
+# кадра смещение, длину и длительность показа.
+#
+# Версия 2: в blob — только уникальные картинки ("images": смещение
+# и длина), а "frames" — последовательность показа: номер картинки и
+# длительность. Одинаковые кадры подряд склеены в один подлиннее,
+# повторы не подряд ссылаются на одну картинку.
+ATLAS_MAGIC = b"PETATLS1"
+ATLAS_SUFFIX = ".atlas"
+ATLAS_VERSION = 2
+ATLAS_VERSIONS = (1, 2)
+
+ANIMATION_FOLDERS = ("idle_clean", "click_clean", "sleeping_clean")
+FRAME_MS = 33
+
+
+def atlas_path(base_dir, folder):
+    return os.path.join(base_dir, folder + ATLAS_SUFFIX)
+
+
+def read_atlas(path):
+    # Один вызов read на всю анимацию
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    head = len(ATLAS_MAGIC) + 4
+    if len(data) < head or not data.startswith(ATLAS_MAGIC):
+        print("Повреждён атлас:", path)
+        return None
+
+    (header_len,) = struct.unpack_from("<I", data, len(ATLAS_MAGIC))
+
+    try:
+        header = json.loads(data[head:head + header_len].decode("utf-8"))
+    except ValueError:
+        print("Повреждён заголовок атласа:", path)
+        return None
+
+    if header.get("version") not in ATLAS_VERSIONS:
+        print("Неизвестная версия атласа:", path)
+        return None
+
+    blob = data[head + header_len:]
+    return header, blob
+
+
+def write_atlas(path, header, blob):
+    raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ATLAS_MAGIC)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def frame_slices(header, blob):
+    # Уникальные картинки (в версии 1 — просто все кадры)
+    for image in header.get("images", header["frames"]):
+        start = image["offset"]
+        yield blob[start:start + image["length"]]
+
+
+def frame_sequence(header, blob):
+    # (картинки, номер картинки для каждого кадра, длительности)
+    images = list(frame_slices(header, blob))
+    frames = header["frames"]
+    if header["version"] == 1:
+        sequence = list(range(len(frames)))
+    else:
+        sequence = [f["image"] for f in frames]
+    durations = [f.get("duration", FRAME_MS) for f in frames]
+    return images, sequence, durations
+
+
+# ===============================
+# РАЗНИЦА МЕЖДУ КАДРАМИ
+# ===============================
+def diff_rect(a, b, width, height, stride, bpp=4):
+    # Прямоугольник [x, y, w, h], где кадры отличаются; None — кадры одинаковые
+    if a == b:
+        return None
+
+    row_len = width * bpp
+    top = bottom = None
+    left, right = width, -1
+
+    for y in range(height):
+        start = y * stride
+        row_a = a[start:start + row_len]
+        row_b = b[start:start + row_len]
+        if row_a == row_b:
+            continue
+
+        if top is None:
+            top = y
+        bottom = y
+
+        # XOR строк как больших чисел: старший бит — первый
+        # отличающийся байт, младший — последний
+        x = int.from_bytes(row_a, "big") ^ int.from_bytes(row_b, "big")
+        first = (row_len * 8 - x.bit_length()) // 8
+        last = row_len - 1 - ((x & -x).bit_length() - 1) // 8
+
+        left = min(left, first // bpp)
+        right = max(right, last // bpp)
+
+    if top is None:
+        return None
+
+    return [left, top, right - left + 1, bottom - top + 1]
+
+
+def dirty_rects(frames, width, height, stride):
+    # Для кадра i — изменения относительно i-1 (для 0 — относительно последнего)
+    return [
+        diff_rect(frames[i - 1], frames[i], width, height, stride)
+        for i in range(len(frames))
+    ]
+
+
+def decode_pixels(data):
+    # Нужен только при сборке: байты ARGB32 premultiplied и длина строки
+    from PyQt5.QtGui import QImage
+
+    image = QImage.fromData(data, "PNG")
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return bytes(ptr), image.bytesPerLine()
+
+
+# ===============================
+# ПОВТОРЫ КАДРОВ
+# ===============================
+def numpy_module():
+    try:
+        import numpy
+    except ImportError:
+        raise SystemExit("Для --palette и --tolerance нужен NumPy: pip install numpy")
+    return numpy
+
+
+def pixels_hash(pixels):
+    return hashlib.blake2b(pixels, digest_size=16).digest()
+
+
+def near_equal(a, b, tolerance):
+    # Каждый канал отличается не больше чем на tolerance
+    if a == b:
+        return True
+    if not tolerance:
+        return False
+    np = numpy_module()
+    diff = np.abs(
+        np.frombuffer(a, dtype=np.uint8).astype(np.int16) -
+        np.frombuffer(b, dtype=np.uint8).astype(np.int16)
+    )
+    return int(diff.max()) <= tolerance
+
+
+def dedup_frames(pixels, durations, tolerance=0):
+    # pixels — байты кадров по порядку. Возвращает (номера уникальных
+    # кадров, последовательность [номер картинки, длительность])
+    unique = []
+    by_hash = {}
+    sequence = []
+
+    for index, frame in enumerate(pixels):
+        if sequence and near_equal(pixels[unique[sequence[-1][0]]], frame, tolerance):
+            # Такой же, как предыдущий, — просто показываем его дольше
+            sequence[-1][1] += durations[index]
+            continue
+
+        key = pixels_hash(frame)
+        image = by_hash.get(key)
+        if image is None:
+            image = by_hash[key] = len(unique)
+            unique.append(index)
+        sequence.append([image, durations[index]])
+
+    return unique, sequence
+
+
+# ===============================
+# ПАЛИТРА (INDEXED8)
+# ===============================
+# Необязательно и с потерями: до 256 цветов ARGB на кадр, подобранных
+# делением куба цветов по медиане (с учётом частоты). Прозрачный
+# цвет всегда отдельный. Нужен NumPy.
+PALETTE_COLORS = 256
+
+
+def median_cut(colors, counts, limit):
+    # colors — уникальные ARGB (N×4), counts — сколько раз встречается
+    np = numpy_module()
+
+    def widest(box):
+        # (разброс, канал) — считается один раз на коробку
+        spread = colors[box].max(0) - colors[box].min(0)
+        channel = int(np.argmax(spread))
+        return int(spread[channel]), channel
+
+    boxes = [np.arange(len(colors))]
+    spans = [widest(boxes[0])]
+
+    while len(boxes) < limit:
+        # Делим коробку с самым большим разбросом по какому-нибудь каналу
+        pick = max(range(len(boxes)), key=lambda i: spans[i][0])
+        span, channel = spans[pick]
+        if span <= 0:
+            break
+
+        box = boxes.pop(pick)
+        spans.pop(pick)
+        box = box[np.argsort(colors[box, channel], kind="stable")]
+        weight = np.cumsum(counts[box])
+        cut = int(np.searchsorted(weight, weight[-1] / 2))
+        cut = min(max(cut, 1), len(box) - 1)
+        for part in (box[:cut], box[cut:]):
+            boxes.append(part)
+            spans.append(widest(part))
+
+    palette = np.array([
+        np.average(colors[box], axis=0, weights=counts[box]) for box in boxes
+    ]).round().astype(np.int32)
+
+    # Каждый уникальный цвет — к ближайшему цвету палитры
+    nearest = np.empty(len(colors), dtype=np.int32)
+    for start in range(0, len(colors), 4096):
+        chunk = colors[start:start + 4096, None, :] - palette[None, :, :]
+        nearest[start:start + 4096] = (chunk * chunk).sum(2).argmin(1)
+    return palette, nearest
+
+
+def palettize(data):
+    # PNG (ARGB) -> PNG Indexed8; возвращает новые байты
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    np = numpy_module()
+    image = QImage.fromData(data, "PNG").convertToFormat(QImage.Format_ARGB32)
+    width, height = image.width(), image.height()
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    argb = np.frombuffer(bytes(ptr), dtype=np.uint32).reshape(height, -1)[:, :width]
+
+    # Все полностью прозрачные пиксели — один цвет
+    argb = np.where(argb >> 24 == 0, 0, argb).ravel()
+    unique, inverse, counts = np.unique(argb, return_inverse=True, return_counts=True)
+
+    if len(unique) <= PALETTE_COLORS:
+        table = unique.astype(np.int64)
+        index = inverse
+    else:
+        transparent = unique == 0
+        colors = np.stack([
+            (unique >> shift) & 0xff for shift in (24, 16, 8, 0)
+        ], axis=1).astype(np.int32)[~transparent]
+        palette, nearest = median_cut(
+            colors, counts[~transparent], PALETTE_COLORS - int(transparent.any())
+        )
+
+        table = (
+            (palette[:, 0].astype(np.int64) << 24) | (palette[:, 1] << 16) |
+            (palette[:, 2] << 8) | palette[:, 3]
+        )
+        mapping = np.empty(len(unique), dtype=np.int64)
+        if transparent.any():
+            table = np.concatenate([[0], table])
+            mapping[transparent] = 0
+            mapping[~transparent] = nearest + 1
+        else:
+            mapping[:] = nearest
+        index = mapping[inverse]
+
+    indexed = QImage(width, height, QImage.Format_Indexed8)
+    indexed.setColorTable([int(c) for c in table])
+    rows = np.ascontiguousarray(index.reshape(height, width).astype(np.uint8))
+    ptr = indexed.bits()
+    ptr.setsize(indexed.sizeInBytes())
+    stride = indexed.bytesPerLine()
+    view = np.frombuffer(ptr, dtype=np.uint8).reshape(height, stride)
+    view[:, :width] = rows
+
+    out = QByteArray()
+    buffer = QBuffer(out)
+    buffer.open(QIODevice.WriteOnly)
+    indexed.save(buffer, "PNG")
+    return bytes(out)
+
+
+# ===============================
+# СБОРКА АТЛАСОВ
+# ===============================
+def png_size(data):
+    # Ширина и высота из чанка IHDR
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("не PNG")
+    return struct.unpack(">II", data[16:24])
+
+
+def list_frame_files(folder_path):
+    return [
+        os.path.join(folder_path, file)
+        for file in sorted(os.listdir(folder_path))
+        if file.endswith(".png")
+    ]
+
+
+def build_atlas(folder_path, out_path, duration=FRAME_MS, tolerance=0, palette=False):
+    chunks = []
+    size = None
+
+    for file_path in list_frame_files(folder_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+
+        frame_size = list(png_size(data))
+        if size is None:
+            size = frame_size
+        elif frame_size != size:
+            raise ValueError(f"{file_path}: размер {frame_size}, ожидался {size}")
+
+        chunks.append(data)
+
+    if not chunks:
+        raise ValueError(f"{folder_path}: нет кадров")
+
+    source_bytes = sum(len(data) for data in chunks)
+    if palette:
+        chunks = [palettize(data) for data in chunks]
+
+    # Повторы ищем по тому, что реально будет на экране
+    pixels = [decode_pixels(data) for data in chunks]
+    stride = pixels[0][1]
+    unique, sequence = dedup_frames(
+        [p for p, _ in pixels], [duration] * len(chunks), tolerance
+    )
+
+    images = []
+    offset = 0
+    for index in unique:
+        images.append({"offset": offset, "length": len(chunks[index])})
+        offset += len(chunks[index])
+
+    # Прямоугольники — между соседними кадрами последовательности
+    shown = [pixels[unique[image]][0] for image, _ in sequence]
+    dirty = dirty_rects(shown, size[0], size[1], stride)
+
+    header = {
+        "version": ATLAS_VERSION,
+        "size": size,
+        "images": images,
+        "frames": [{"image": image, "duration": ms} for image, ms in sequence],
+        "dirty": dirty,
+        "palette": palette
+    }
+    write_atlas(out_path, header, b"".join(chunks[index] for index in unique))
+
+    frame_bytes = size[0] * size[1] * 4
+    report = {
+        "frames": len(chunks),
+        "images": len(unique),
+        "shown": len(sequence),
+        "source_bytes": source_bytes,
+        "atlas_bytes": offset,
+        "decoded_bytes": len(chunks) * frame_bytes,
+        "decoded_unique_bytes": len(unique) * frame_bytes,
+    }
+    return header, report
+
+
+def kb(n):
+    return f"{n / 1024:.0f} КБ"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Упаковка папок с кадрами анимации в атласы"
+    )
+    parser.add_argument("folders", nargs="*", default=list(ANIMATION_FOLDERS))
+    parser.add_argument("--src", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--duration", type=int, default=FRAME_MS)
+    parser.add_argument(
+        "--tolerance", type=int, default=0,
+        help="склеивать соседние кадры, отличающиеся не больше чем на N по каждому каналу"
+    )
+    parser.add_argument(
+        "--palette", action="store_true",
+        help="хранить кадры в 256 цветах (Indexed8, с потерями)"
+    )
+    args = parser.parse_args(argv)
+
+    out_dir = args.out or args.src
+    os.makedirs(out_dir, exist_ok=True)
+
+    for folder in args.folders:
+        out_path = atlas_path(out_dir, folder)
+        header, report = build_atlas(
+            os.path.join(args.src, folder), out_path,
+            args.duration, args.tolerance, args.palette
+        )
+        changed = [r for r in header["dirty"] if r]
+        area = header["size"][0] * header["size"][1]
+        share = sum(r[2] * r[3] for r in changed) / (area * len(header["dirty"]))
+        print(
+            f"{folder}: {report['frames']} кадров -> {out_path} "
+            f"(уникальных {report['images']}, показов {report['shown']}, "
+            f"перерисовка {share:.0%} площади)"
+        )
+        print(
+            f"  на диске {kb(report['source_bytes'])} -> {kb(report['atlas_bytes'])} "
+            f"(−{kb(report['source_bytes'] - report['atlas_bytes'])}), "
+            f"в памяти {kb(report['decoded_bytes'])} -> {kb(report['decoded_unique_bytes'])} "
+            f"(−{kb(report['decoded_bytes'] - report['decoded_unique_bytes'])})"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+import platform
+import subprocess
+from datetime import date, datetime, timedelta
+
+
+# ===============================
+# ЗАМЕРЫ БЕЗ ЭКРАНА
+# ===============================
+# Каждый размер данных меряется в отдельном процессе: чистый импорт,
+# свой временный APPDATA, честный пиковый RSS. Qt — offscreen.
+#
+#   python bench.py                          — все размеры, JSON в stdout
+#   python bench.py --out bench.json         — сохранить результат
+#   python bench.py --compare bench.json     — сравнить, код 1 при регрессии
+SIZES = (10, 1000, 10000, 100000)
+TICKS = 300
+# Прогонов на размер; берём лучшее значение каждой метрики
+REPEAT = 3
+CHILD_TIMEOUT = 600
+
+# Регрессия — медленнее на threshold И на абсолютную величину больше
+# шума для этой единицы (мелкие значения сильно пляшут)
+THRESHOLD = 0.5
+NOISE = {"_ms": 2.0, "_us": 20.0, "_mb": 5.0}
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ===============================
+# СИНТЕТИЧЕСКИЕ ДАННЫЕ
+# ===============================
+def make_dataset(count, seed=0):
+    # Дни рождения за 55 лет, события — от месяца назад до года вперёд
+    rng = random.Random(seed)
+    today = date.today()
+
+    birthdays = []
+    events = []
+    for i in range(count):
+        born = date(1960, 1, 1) + timedelta(days=rng.randint(0, 20000))
+        birthdays.append({
+            "id": f"b{i:06d}",
+            "name": f"Person {i}",
+            "day": born.day,
+            "month": born.month,
+            "year": born.year
+        })
+
+        when = today + timedelta(days=rng.randint(-30, 400))
+        events.append({
+            "id": f"e{i:06d}",
+            "title": f"Event {i}",
+            "day": when.day,
+            "month": when.month,
+            "year": when.year,
+            "hour": rng.randint(0, 23),
+            "minute": rng.randint(0, 59),
+            "remind_before": rng.randint(0, 7)
+        })
+
+    return birthdays, events
+
+
+def write_dataset(data_dir, count):
+    birthdays, events = make_dataset(count)
+    os.makedirs(data_dir, exist_ok=True)
+    for name, records in (("birthdays", birthdays), ("events", events)):
+        with open(os.path.join(data_dir, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=4)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — КБ, macOS — байты
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ===============================
+# ОДИН ПРОГОН (ДОЧЕРНИЙ ПРОЦЕСС)
+# ===============================
+def ms_since(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_child(count):
+    # APPDATA и рабочая папка — до импорта pet: пути считаются при импорте
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(BENCH_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    appdata = tempfile.mkdtemp(prefix="pet-bench-")
+    os.environ["APPDATA"] = appdata
+    write_dataset(os.path.join(appdata, "PetReminder"), count)
+
+    try:
+        return measure(count)
+    finally:
+        shutil.rmtree(appdata, ignore_errors=True)
+
+
+def calibrate():
+    # Эталонная нагрузка: по ней сравнение делает поправку на то,
+    # что машина в этот раз просто медленнее или занята
+    started = time.perf_counter()
+    rng = random.Random(1)
+    for _ in range(5):
+        sorted(rng.random() for _ in range(100000))
+    return ms_since(started)
+
+
+def measure(count):
+    result = {"records": count, "calibration_ms": calibrate()}
+
+    started = time.perf_counter()
+    import pet
+    from PyQt5.QtWidgets import QApplication
+    result["import_ms"] = ms_since(started)
+
+    app = QApplication([])
+
+    def pump(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            app.processEvents()
+
+    # Запуск: до первого кадра, затем до конца фоновой загрузки кадров
+    started = time.perf_counter()
+    p = pet.Pet()
+    result["startup_ms"] = ms_since(started)
+
+    while p.frames.loader.isRunning():
+        app.processEvents()
+        p.frames.loader.wait(5)
+    app.processEvents()
+    result["frames_loaded_ms"] = ms_since(started)
+
+    # Чтение хранилищ с диска: снимок + журнал + индекс
+    started = time.perf_counter()
+    pet.birthday_store.load()
+    pet.event_store.load()
+    result["stores_load_ms"] = ms_since(started)
+
+    # Тик анимации: смена кадра + перерисовка грязного прямоугольника
+    started = time.perf_counter()
+    for _ in range(TICKS):
+        p.update_frame()
+        app.processEvents()
+    result["update_frame_us"] = round((time.perf_counter() - started) * 1e6 / TICKS, 1)
+
+    # Напоминания
+    pet.save_last_check({})
+    started = time.perf_counter()
+    p.check_birthdays_once()
+    result["check_birthdays_ms"] = ms_since(started)
+
+    started = time.perf_counter()
+    p.reminders.rebuild()
+    result["reminders_rebuild_ms"] = ms_since(started)
+
+    started = time.perf_counter()
+    p.show_next_birthday()
+    result["next_birthday_ms"] = ms_since(started)
+
+    # Редакторы: первое открытие, повторное, сохранение одной правки
+    for prefix, opener, attr in (
+        ("birthdays", p.open_birthday_window, "birthday_window"),
+        ("events", p.open_events_window, "events_window"),
+    ):
+        started = time.perf_counter()
+        opener()
+        window = getattr(p, attr)
+        window.repaint()
+        result[f"{prefix}_open_ms"] = ms_since(started)
+
+        window.close()
+        app.processEvents()
+
+        started = time.perf_counter()
+        opener()
+        window.repaint()
+        result[f"{prefix}_reopen_ms"] = ms_since(started)
+
+        index = window.model.index(0, 0)
+        window.model.setData(index, "Изменено", pet.Qt.EditRole)
+        started = time.perf_counter()
+        window.save_data()
+        pet.writer.flush()
+        result[f"{prefix}_save_ms"] = ms_since(started)
+
+        window.close()
+        app.processEvents()
+
+    pump(0.05)
+    p.frames.stop_loader()
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+# ===============================
+# СРАВНЕНИЕ С ПРОШЛЫМ ПРОГОНОМ
+# ===============================
+def noise_for(metric):
+    for suffix, noise in NOISE.items():
+        if metric.endswith(suffix):
+            return noise
+    return 0
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # [(размер, метрика, было, стало)] — только заметно хуже
+    regressions = []
+    for size, results in current["results"].items():
+        before = baseline.get("results", {}).get(size)
+        if not before:
+            continue
+
+        # Времена приводим к скорости машины в прошлом прогоне
+        speed = 1.0
+        if before.get("calibration_ms") and results.get("calibration_ms"):
+            speed = before["calibration_ms"] / results["calibration_ms"]
+
+        for metric, value in results.items():
+            old = before.get(metric)
+            if metric in ("records", "calibration_ms") or not isinstance(value, (int, float)):
+                continue
+            if not isinstance(old, (int, float)):
+                continue
+            if not metric.endswith("_mb"):
+                value = round(value * speed, 2)
+            if value > old * (1 + threshold) and value - old > noise_for(metric):
+                regressions.append((size, metric, old, value))
+
+    return regressions
+
+
+def run_once(count):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", str(count)],
+        capture_output=True, text=True, timeout=CHILD_TIMEOUT
+    )
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        raise SystemExit(f"Прогон на {count} записей упал")
+    # Приложение печатает свои строки — результат последней строкой
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def best_of(runs):
+    # Минимум по каждой метрике: меньше всего зависит от фоновой нагрузки
+    best = dict(runs[0])
+    for run in runs[1:]:
+        for metric, value in run.items():
+            if isinstance(value, (int, float)) and isinstance(best.get(metric), (int, float)):
+                best[metric] = min(best[metric], value)
+    return best
+
+
+def run_sizes(sizes, repeat=REPEAT):
+    results = {}
+    for count in sizes:
+        print(f"… {count} записей", file=sys.stderr)
+        results[str(count)] = best_of([run_once(count) for _ in range(repeat)])
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ticks": TICKS,
+            "repeat": repeat,
+        },
+        "results": results
+    }
+
+
+def print_table(report):
+    sizes = list(report["results"])
+    metrics = [m for m in report["results"][sizes[0]] if m != "records"]
+
+    print(f"{'':24}" + "".join(f"{s:>12}" for s in sizes), file=sys.stderr)
+    for metric in metrics:
+        row = "".join(
+            f"{report['results'][s].get(metric, ''):>12}" for s in sizes
+        )
+        print(f"{metric:24}{row}", file=sys.stderr)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Замеры запуска, анимации, напоминаний и редакторов без экрана"
+    )
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_child(args.child)))
+        return 0
+
+    report = run_sizes([int(s) for s in args.sizes.split(",") if s], max(1, args.repeat))
+    print_table(report)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(baseline, report, args.threshold)
+        for size, metric, old, new in regressions:
+            print(f"РЕГРЕССИЯ {size}: {metric} {old} -> {new}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Регрессий нет", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,19 +3,45 @@ import os
 import random
 import time
 import json
-from datetime import date
+import uuid
+import itertools
+import heapq
+import csv
+from collections import OrderedDict, deque
+from datetime import date, datetime
 
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QMessageBox,
     QMenu, QWidget, QVBoxLayout,
-    QTableWidget, QTableWidgetItem,
+    QTableView, QStyledItemDelegate, QAbstractItemView,
     QPushButton,
-    QDateEdit, QTimeEdit,
-    QSystemTrayIcon, QAction
+    QDateEdit, QTimeEdit, QComboBox,
+    QSystemTrayIcon, QAction, QFileDialog
 )
 
-from PyQt5.QtCore import Qt, QTimer, QPoint, QDate, QTime
-from PyQt5.QtGui import QPixmap, QIcon  # === ДОБАВЛЕНО TRAY ===
+from PyQt5.QtCore import Qt, QTimer, QPoint, QDate, QTime, QThread, QObject, pyqtSignal
+from PyQt5.QtCore import QRect, QAbstractTableModel, QModelIndex, QFileSystemWatcher, QEvent
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QPainter, QRegion, QBitmap  # === ДОБАВЛЕНО TRAY ===
+
+import atlas
+import theme
+import reminders
+from reminders import (
+    data_dir, data_path, to_int, use_numpy, json_bytes,
+    writer, birthday_store, event_store,
+    load_last_check, save_last_check, load_events_last_check, save_events_last_check,
+    REPEAT_STEPS, REPEAT_LABELS, repeat_text,
+    vector_fire_times, event_fire_time, repeat_fire_times, next_midnight,
+    birthday_notices, birthday_age_notices, event_notice,
+    import_records, export_records, store_fingerprints,
+)
+
+# Точка отсчёта для замеров времени запуска
+STARTUP_T0 = time.perf_counter()
+
+
+def elapsed_ms():
+    return round((time.perf_counter() - STARTUP_T0) * 1000)
 
 
 # ===============================
@@ -27,93 +53,944 @@ else:
     base_path = os.path.abspath(".")
 
 # ===============================
-# ПАПКА ДЛЯ ХРАНЕНИЯ ДАННЫХ (AppData)
+# НАСТРОЙКИ
 # ===============================
-from pathlib import Path
+DEFAULT_SETTINGS = {
+    # бюджет кэша декодированных кадров (МБ)
+    "frame_cache_mb": 16,
+    # сколько кадров декодировать заранее впереди текущего
+    "frame_prefetch": 3,
+    # минимальная длительность кадра во сне (мс) — реже просыпаемся
+    "sleep_frame_ms": 100,
+    # через сколько секунд без взаимодействия питомец засыпает
+    "sleep_after": 10,
+    # сколько питомцев на экране (кадры и таймер у всех общие)
+    "pet_count": 1,
+    # питомцы и уведомления в одном прозрачном окне поверх экрана
+    "overlay": False,
+    # замеры для панели «Диагностика» в трее и diagnostics.json
+    "diagnostics": False,
+    # как часто сбрасывать замеры в diagnostics.json (секунды)
+    "diagnostics_dump_s": 60,
+    # сколько уведомлений видно одновременно (остальные ждут очереди)
+    "toast_max_visible": 3,
+    # сколько напоминаний помещается в одно уведомление
+    "toast_page_size": 5,
+    # сколько секунд висит уведомление
+    "toast_seconds": 6,
+}
+
+
+def load_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(data_path("settings.json"), "r", encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+# ===============================
+# КАДРЫ: ЛЕНИВОЕ ДЕКОДИРОВАНИЕ + КЭШ
+# ===============================
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+def decode_frame(source):
+    # source — путь к PNG или байты кадра из атласа
+    if isinstance(source, str):
+        return QPixmap(source)
+
+    pixmap = QPixmap()
+    pixmap.loadFromData(source, "PNG")
+    return pixmap
+
+
+def image_pixels(image):
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return bytes(ptr), image.bytesPerLine()
+
+
+def decode_image(source):
+    # То же, что decode_frame, но QImage — можно вызывать из потока
+    if isinstance(source, str):
+        return QImage(source)
+    return QImage.fromData(source, "PNG")
+
+
+# Маска попаданий кадра: бит на пиксель (MonoLSB), 1 — непрозрачный.
+# Считается при загрузке, проверка клика — одно обращение к байту.
+def alpha_bits(image):
+    mask = image.createAlphaMask().convertToFormat(QImage.Format_MonoLSB)
+    ptr = mask.constBits()
+    ptr.setsize(mask.sizeInBytes())
+    return bytes(ptr), mask.bytesPerLine()
+
+
+def bits_hit(bits, x, y):
+    data, stride = bits
+    return bool(data[y * stride + (x >> 3)] >> (x & 7) & 1)
+
+
+class PixmapCache:
+    # LRU по байтам: держим только то, что реально играет
+    def __init__(self, budget_bytes):
+        self.budget = budget_bytes
+        self.bytes = 0
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        pixmap = self.items.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        old = self.items.pop(key, None)
+        if old is not None:
+            self.bytes -= pixmap_bytes(old)
+
+        self.items[key] = pixmap
+        self.bytes += pixmap_bytes(pixmap)
+
+        # Последний добавленный кадр не выселяем никогда
+        while self.bytes > self.budget and len(self.items) > 1:
+            _, evicted = self.items.popitem(last=False)
+            self.bytes -= pixmap_bytes(evicted)
+
+    def evict(self, name):
+        # Все кадры одной анимации
+        for key in [k for k in self.items if k[0] == name]:
+            self.bytes -= pixmap_bytes(self.items.pop(key))
+
+
+class FrameProvider:
+    # Ведёт себя как список кадров, но декодирует их по запросу.
+    # sources — уникальные картинки, sequence — номер картинки для
+    # каждого кадра: повторяющийся кадр декодируется и хранится один раз
+    def __init__(self, name, sources, durations, cache, dirty=None, sequence=None):
+        self.name = name
+        self.cache = cache
+        self.set_sources(sources, durations, dirty, sequence)
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __getitem__(self, index):
+        return self.image(self.sequence[index])
+
+    def image(self, number):
+        key = (self.name, number)
+        pixmap = self.cache.get(key)
+        if pixmap is None:
+            pixmap = decode_frame(self.sources[number])
+            self.cache.put(key, pixmap)
+        return pixmap
+
+    def set_sources(self, sources, durations, dirty=None, sequence=None):
+        self.sources = sources
+        self.sequence = sequence if sequence is not None else list(range(len(sources)))
+        self.durations = durations
+        # Изменившийся прямоугольник кадра i относительно i-1:
+        # из атласа, либо считается при первом показе
+        self.dirty = dirty
+        self.dirty_memo = {}
+        # Маски попаданий по картинкам (приходят из загрузчика) и
+        # объединение по всей анимации — для setMask окна
+        self.masks = {}
+        self.union = None
+
+    def dirty_rect(self, index):
+        # None — кадр совпадает с предыдущим, перерисовывать нечего
+        if self.dirty is not None:
+            rect = self.dirty[index]
+        elif index in self.dirty_memo:
+            rect = self.dirty_memo[index]
+        else:
+            prev, stride = image_pixels(self[index - 1].toImage())
+            cur, _ = image_pixels(self[index].toImage())
+            size = self[index].size()
+            rect = atlas.diff_rect(prev, cur, size.width(), size.height(), stride)
+            self.dirty_memo[index] = rect
+
+        return QRect(*rect) if rect else None
+
+    def adopt(self, number, image, bits):
+        # Картинка, декодированная в фоне: QPixmap создаём только в GUI-потоке.
+        # image = None — не влезла в бюджет, пришла только маска
+        self.masks[number] = bits
+        key = (self.name, number)
+        if image is not None and key not in self.cache:
+            self.cache.put(key, QPixmap.fromImage(image))
+
+    def mask_bits(self, index):
+        number = self.sequence[index]
+        bits = self.masks.get(number)
+        if bits is None:
+            # Кадр показали раньше, чем до него дошёл загрузчик
+            bits = self.masks[number] = alpha_bits(self.image(number).toImage())
+        return bits
+
+    def mask_region(self):
+        # Где анимация хоть в одном кадре непрозрачна; None — маски
+        # ещё не загружены, окно пока ловит клики целиком
+        if self.union is None and self.sources and len(self.masks) >= len(self.sources):
+            union = 0
+            for data, _ in self.masks.values():
+                union |= int.from_bytes(data, "little")
+
+            data, stride = self.masks[0]
+            size = self.image(0).size()
+            image = QImage(
+                union.to_bytes(len(data), "little"),
+                size.width(), size.height(), stride, QImage.Format_MonoLSB
+            )
+            image.setColorTable([0xffffffff, 0xff000000])
+            self.union = QRegion(QBitmap.fromImage(image))
 
-app_data_dir = Path(os.getenv("APPDATA")) / "PetReminder"
-app_data_dir.mkdir(parents=True, exist_ok=True)
+        return self.union
 
-app_dir = str(app_data_dir)
+    def prefetch(self, index, count):
+        # Обычно не хватает только одного кадра на краю окна
+        total = len(self.sequence)
+        for i in range(index, index + min(count, total)):
+            number = self.sequence[i % total]
+            key = (self.name, number)
+            if key not in self.cache:
+                self.cache.put(key, decode_frame(self.sources[number]))
+
+
+def open_animation(folder):
+    # Только находит кадры (атлас или папка), ничего не декодирует
+    # (картинки, длительности, грязные прямоугольники, последовательность)
+    packed = atlas.read_atlas(atlas.atlas_path(base_path, folder))
+    if packed:
+        header, blob = packed
+        sources, sequence, durations = atlas.frame_sequence(header, blob)
+        return sources, durations, header.get("dirty"), sequence
+
+    folder_path = os.path.join(base_path, folder)
+    if not os.path.exists(folder_path):
+        return [], [], None, None
+
+    sources = atlas.list_frame_files(folder_path)
+    return sources, [atlas.FRAME_MS] * len(sources), None, None
 
 
 # ===============================
-# СКЛОНЕНИЯ
+# ФОНОВАЯ ЗАГРУЗКА КАДРОВ
 # ===============================
-def years_word(n):
-    if 11 <= n % 100 <= 14:
-        return "лет"
-    if n % 10 == 1:
-        return "год"
-    if 2 <= n % 10 <= 4:
-        return "года"
-    return "лет"
+class FrameLoader(QThread):
+    animation_opened = pyqtSignal(str, list, list, object, object)
+    frames_decoded = pyqtSignal(str, list)
+
+    BATCH = 8
+
+    def __init__(self, jobs, budget_bytes):
+        super().__init__()
+        # jobs: [(папка, картинки или None, номера уже готовых картинок)]
+        self.jobs = jobs
+        self.budget = budget_bytes
+
+    def run(self):
+        budget = self.budget
+
+        for folder, sources, skip in self.jobs:
+            if sources is None:
+                sources, durations, dirty, sequence = open_animation(folder)
+                self.animation_opened.emit(folder, sources, durations, dirty, sequence)
+
+            # Маски нужны для всех кадров: то, что уже в кэше или не
+            # влезло в бюджет, декодируем только ради маски
+            batch = []
+            for index, source in enumerate(sources):
+                if self.isInterruptionRequested():
+                    return
+
+                image = decode_image(source)
+                bits = alpha_bits(image)
 
+                if index in skip or budget < 0:
+                    image = None
+                else:
+                    budget -= image.sizeInBytes()
+                    if budget < 0:
+                        image = None
 
-def days_word(n):
-    if 11 <= n % 100 <= 14:
-        return "дней"
-    if n % 10 == 1:
-        return "день"
-    if 2 <= n % 10 <= 4:
-        return "дня"
-    return "дней"
+                batch.append((index, image, bits))
+                if len(batch) >= self.BATCH:
+                    self.frames_decoded.emit(folder, batch)
+                    batch = []
+
+            if batch:
+                self.frames_decoded.emit(folder, batch)
 
 
 # ===============================
-# ФАЙЛЫ
+# ОБЩИЕ КАДРЫ ДЛЯ ВСЕХ ПИТОМЦЕВ
 # ===============================
-def load_birthdays():
-    try:
-        with open(os.path.join(app_dir, "birthdays.json"), "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
+# Анимация загружается и декодируется один раз на процесс, сколько
+# бы питомцев её ни показывали: у каждого только свой индекс кадра.
+# Счётчик ссылок освобождает анимацию вместе с её кадрами в кэше,
+# когда её не показывает больше никто.
+class SharedFrames:
+    def __init__(self, settings):
+        self.cache = PixmapCache(settings["frame_cache_mb"] * 1024 * 1024)
+        self.prefetch = settings["frame_prefetch"]
+        self.providers = {}
+        self.refs = {}
+        self.loader = None
+
+    def acquire(self, folder, sync=False):
+        # sync — открыть сразу (нужно для первого кадра), иначе — в фоне
+        provider = self.providers.get(folder)
+        if provider is None:
+            if sync:
+                sources, durations, dirty, sequence = open_animation(folder)
+            else:
+                sources, durations, dirty, sequence = [], [], None, None
+            provider = FrameProvider(folder, sources, durations, self.cache, dirty, sequence)
+            self.providers[folder] = provider
+            self.refs[folder] = 0
+
+        self.refs[folder] += 1
+        return provider
+
+    def release(self, folder):
+        self.refs[folder] -= 1
+        if self.refs[folder] <= 0:
+            del self.refs[folder]
+            del self.providers[folder]
+            self.cache.evict(folder)
+
+    def start_loader(self):
+        # Догружаем всё, что открыто: неоткрытые — целиком, остальные —
+        # кроме кадров, которые уже в кэше
+        jobs = []
+        for folder, provider in self.providers.items():
+            if provider.sources:
+                ready = {i for i in range(len(provider.sources)) if (folder, i) in self.cache}
+                jobs.append((folder, provider.sources, ready))
+            else:
+                jobs.append((folder, None, set()))
+
+        self.loader = FrameLoader(jobs, self.cache.budget)
+        self.loader.animation_opened.connect(self.on_animation_opened)
+        self.loader.frames_decoded.connect(self.on_frames_decoded)
+        QApplication.instance().aboutToQuit.connect(self.stop_loader)
+        self.loader.start()
+
+    def stop_loader(self):
+        self.loader.requestInterruption()
+        self.loader.wait()
+
+    def on_animation_opened(self, folder, sources, durations, dirty, sequence):
+        # С этого момента анимация может включаться
+        provider = self.providers.get(folder)
+        if provider is not None:
+            provider.set_sources(sources, durations, dirty, sequence)
+
+    def on_frames_decoded(self, folder, batch):
+        provider = self.providers.get(folder)
+        if provider is None:
+            return
+        for index, image, bits in batch:
+            provider.adopt(index, image, bits)
 
 
-def save_birthdays(data):
-    with open(os.path.join(app_dir, "birthdays.json"), "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+# ===============================
+# ЧАСЫ АНИМАЦИИ
+# ===============================
+# Один таймер на всех питомцев. У каждого питомца — момент следующего
+# кадра, засыпания и случайного действия; таймер взводится на
+# ближайший из кадров и за одно пробуждение двигает всех, кому пора.
+# Скрытые питомцы не участвуют; если скрыты все — таймер стоит.
+# Спящий питомец меняет кадры не чаще sleep_frame_ms.
+# Кадр, до которого осталось меньше CLOCK_SLACK_MS, показываем в этом
+# же пробуждении: питомцы не расходятся по фазе на отдельные тики.
+CLOCK_SLACK_MS = 8
+
+
+def clock_ms():
+    return time.monotonic() * 1000
+
+
+class AnimationClock:
+    def __init__(self, sleep_frame_ms):
+        self.sleep_frame_ms = sleep_frame_ms
+        self.pets = []
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.CoarseTimer)
+        self.timer.timeout.connect(self.tick)
+
+        self.wakeups = 0
+        # Отметка «с прошлого вызова» — своя у каждого читателя
+        self.wakeups_marks = {}
+        self.started_at = time.perf_counter()
+
+        # Диагностика: на что был взведён таймер и кому сообщить о тике
+        self.armed_for = None
+        self.probe = None
+
+    def add(self, pet):
+        self.pets.append(pet)
+
+    def remove(self, pet):
+        if pet in self.pets:
+            self.pets.remove(pet)
+        self.schedule()
+
+    def next_due(self):
+        # Ближайший тик, к которому можно пристроить ещё одного питомца
+        dues = [pet.frame_due for pet in self.pets if pet.active]
+        return min(dues) if dues else clock_ms()
+
+    def interval(self, pet):
+        frames, index = pet.shown
+        duration = frames.durations[index] if frames.durations else atlas.FRAME_MS
+        if pet.sleeping:
+            return max(duration, self.sleep_frame_ms)
+        return duration
+
+    def tick(self):
+        self.wakeups += 1
+        now = clock_ms()
+        soon = now + CLOCK_SLACK_MS
+
+        if self.probe is not None:
+            self.probe.on_tick(self, now)
+
+        for pet in list(self.pets):
+            if not pet.active:
+                continue
 
+            pet.run_timers(soon)
 
-def load_last_check():
-    try:
-        with open(os.path.join(app_dir, "birthday_notified.json"), "r") as f:
-            return json.load(f)
-    except:
-        return {}
+            if pet.frame_due <= soon:
+                pet.update_frame()
+                # От прошлого срока, а не от «сейчас» — без накопления
+                # опозданий; после долгого простоя — от «сейчас»
+                pet.frame_due = max(pet.frame_due + self.interval(pet), now)
+
+        self.schedule(now)
 
+    def schedule(self, now=None):
+        dues = [pet.frame_due for pet in self.pets if pet.active]
+        if not dues:
+            self.timer.stop()
+            return
 
-def save_last_check(data):
-    with open(os.path.join(app_dir, "birthday_notified.json"), "w") as f:
-        json.dump(data, f)
+        if now is None:
+            now = clock_ms()
+        self.armed_for = min(dues)
+        self.timer.start(max(0, round(self.armed_for - now)))
+
+    def wakeups_per_minute(self, key=None):
+        # Пробуждений в минуту с прошлого вызова с тем же key
+        now = time.perf_counter()
+        then, wakeups = self.wakeups_marks.get(key, (self.started_at, 0))
+        self.wakeups_marks[key] = (now, self.wakeups)
+        if now <= then:
+            return 0
+        return round((self.wakeups - wakeups) * 60 / (now - then))
 
 
 # ===============================
-# СОБЫТИЯ (ОТДЕЛЬНО ОТ ДР)
+# ПЛАНИРОВЩИК НАПОМИНАНИЙ
 # ===============================
+# Никакого опроса: в куче лежат будущие моменты срабатывания,
+# один таймер взведён ровно на ближайший. Раз в сутки (в полночь)
+# срабатывает запись "day" — проверка дней рождения.
+# Монотонные часы могут не идти во сне системы, поэтому таймер
+# взводится не дольше чем на SCHEDULER_MAX_ARM_MS и при каждом
+# срабатывании сверяется с настенными часами.
+SCHEDULER_MAX_ARM_MS = 30 * 60 * 1000
 
-def load_events():
-    try:
-        with open(os.path.join(app_dir, "events.json"), "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
 
-def save_events(data):
-    with open(os.path.join(app_dir, "events.json"), "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+class ReminderScheduler(QObject):
+    def __init__(self, pet):
+        super().__init__()
+        self.pet = pet
+        self.heap = []
+        self.seq = itertools.count()
+        self.fired = None
 
-def load_events_last_check():
-    try:
-        with open(os.path.join(app_dir, "events_notified.json"), "r") as f:
-            return json.load(f)
-    except:
-        return {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.VeryCoarseTimer)
+        self.timer.timeout.connect(self.on_timer)
+
+        event_store.subscribe(self.rebuild)
+
+    def fired_today(self, today):
+        # id событий, о которых уже напомнили сегодня
+        today_str = today.strftime("%Y-%m-%d")
+        if self.fired is None or self.fired[0] != today_str:
+            last = load_events_last_check()
+            ids = set(last.get("fired", [])) if last.get("date") == today_str else set()
+            self.fired = (today_str, ids)
+        return self.fired[1]
+
+    def push(self, when, kind, payload=None):
+        heapq.heappush(self.heap, (when, next(self.seq), kind, payload))
+
+    def rebuild(self):
+        now = datetime.now()
+        fired = self.fired_today(now.date())
+        due = []
+
+        self.heap = [(next_midnight(now), next(self.seq), "day", None)]
+        events = event_store.all()
+        # Серии: в куче только ближайшее повторение каждой
+        rules = event_store.index.rules
+        if rules:
+            events = [e for e in events if e["id"] not in rules]
+
+        # Полезная нагрузка — (id, дата повторения); у разовых даты нет
+        if use_numpy(len(events)):
+            upcoming, today_ids = vector_fire_times(events, now)
+            self.heap.extend(
+                (when, next(self.seq), "event", (record_id, None))
+                for when, record_id in upcoming
+            )
+            due = [(i, None) for i in today_ids if i not in fired]
+        else:
+            for e in events:
+                when = event_fire_time(e)
+                if when is None:
+                    continue
+                if when > now:
+                    self.heap.append((when, next(self.seq), "event", (e["id"], None)))
+                elif when.date() == now.date() and e["id"] not in fired:
+                    # Сегодняшнее, но уже прошедшее (запуск, правка, сон)
+                    due.append((e["id"], None))
+        heapq.heapify(self.heap)
+
+        for record_id, rule in rules.items():
+            self.push_series(record_id, rule, now, fired, due)
+
+        self.fire_events(due, now)
+        self.arm()
+
+    def on_timer(self):
+        now = datetime.now()
+        due = []
+        new_day = False
+
+        while self.heap and self.heap[0][0] <= now:
+            when, _, kind, payload = heapq.heappop(self.heap)
+            if kind == "day":
+                new_day = True
+            elif payload[1] is not None:
+                # Повторение серии: сегодняшнее — в due, следующее — в кучу
+                rule = event_store.index.rules.get(payload[0])
+                if rule is not None:
+                    self.push_series(payload[0], rule, now, self.fired_today(now.date()), due)
+            elif when.date() == now.date():
+                # Проспанное в прошлые дни не показываем
+                due.append(payload)
+
+        if new_day:
+            self.push(next_midnight(now), "day")
+            self.pet.check_birthdays_once()
+
+        self.fire_events(due, now)
+        self.arm()
+
+    def push_series(self, record_id, rule, now, fired, due):
+        # Прошедшее сегодняшнее повторение — в due, ближайшее будущее — в кучу
+        e = event_store.get(record_id)
+        for when, day in repeat_fire_times(e, rule, now.date()):
+            if when > now:
+                self.push(when, "event", (record_id, day))
+                return
+            if record_id not in fired:
+                due.append((record_id, day))
+
+    def fire_events(self, due, now):
+        today = now.date()
+        fired = self.fired_today(today)
+        events = []
+        for record_id, day in due:
+            e = event_store.get(record_id)
+            if e is not None and record_id not in fired:
+                fired.add(record_id)
+                events.append((day, e))
+
+        if not events:
+            return
+
+        save_events_last_check({"date": self.fired[0], "fired": sorted(fired)})
+        self.pet.show_event_reminders(events, today)
+
+    def arm(self):
+        if not self.heap:
+            self.timer.stop()
+            return
+
+        delay = (self.heap[0][0] - datetime.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(delay + 1, 0), SCHEDULER_MAX_ARM_MS)))
 
-def save_events_last_check(data):
-    with open(os.path.join(app_dir, "events_notified.json"), "w") as f:
-        json.dump(data, f)
+
+# ===============================
+# СЛЕЖЕНИЕ ЗА ФАЙЛАМИ ДАННЫХ
+# ===============================
+# Папку с данными могут синхронизировать между машинами. Записи
+# живут в памяти; QFileSystemWatcher сообщает о любой правке в
+# папке, а перечитываем только то хранилище, чьи файлы изменились
+# по (mtime, размер) не нами. Разбор и индекс строятся в потоке.
+WATCH_SETTLE_MS = 500
+
+
+class StoreReloader(QThread):
+    loaded = pyqtSignal(object, object)
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def run(self):
+        # Подписи — до чтения: правка посреди чтения не потеряется
+        signatures = self.store.disk_signatures()
+        self.loaded.emit(self.store.read_disk(), signatures)
+
+
+class StoreWatcher(QObject):
+    def __init__(self, stores, parent=None):
+        super().__init__(parent)
+        self.stores = stores
+        self.reloaders = {}
+
+        # Синхронизация пишет пачкой — ждём, пока папка успокоится
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(WATCH_SETTLE_MS)
+        self.timer.timeout.connect(self.check)
+
+        # Атомарная замена файла снимает слежку за ним, поэтому
+        # следим и за папкой, а файлы переподключаем после проверки
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(data_dir())
+        self.watch_files()
+        self.watcher.directoryChanged.connect(self.timer.start)
+        self.watcher.fileChanged.connect(self.timer.start)
+
+    def watch_files(self):
+        watched = set(self.watcher.files())
+        missing = [
+            path
+            for store in self.stores
+            for path in store.disk_paths()
+            if path not in watched and os.path.exists(path)
+        ]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def check(self):
+        self.watch_files()
+
+        for store in self.stores:
+            # Ещё не читали — прочитаем при первом обращении
+            if store.records is None or store.name in self.reloaders:
+                continue
+            # Своя правка ещё в очереди записи — сначала допишем её, иначе
+            # перечитанный файл её не увидит и она пропадёт из памяти
+            if any(path in writer.pending for path in store.disk_paths()):
+                writer.flush()
+            if store.changed_on_disk():
+                self.start_reload(store)
+
+    def start_reload(self, store):
+        reloader = StoreReloader(store)
+        generation = store.generation
+        reloader.loaded.connect(
+            lambda loaded, signatures: self.on_loaded(store, generation, loaded, signatures)
+        )
+        self.reloaders[store.name] = reloader
+        reloader.start()
+
+    def on_loaded(self, store, generation, loaded, signatures):
+        self.reloaders.pop(store.name).wait()
+
+        if store.generation != generation:
+            # Пока читали, сохранились сами — перечитаем заново
+            self.timer.start()
+            return
+
+        # Молча: при синхронизации папки это обычное дело. Число
+        # перезагрузок видно в диагностике (ReminderStore.reload)
+        store.reload(loaded, signatures)
+
+    def stop(self):
+        for reloader in self.reloaders.values():
+            reloader.wait()
+
+
+# ===============================
+# ФОНОВЫЙ ИМПОРТ
+# ===============================
+# Разбор файла (reminders.import_records) идёт в потоке, в хранилище
+# результат кладёт основной поток — одним put_many.
+class ImportWorker(QThread):
+    progress = pyqtSignal(int)
+    imported = pyqtSignal(object, object, object)
+
+    def __init__(self, store, path):
+        super().__init__()
+        self.store = store
+        self.path = path
+        # Отпечатки — в основном потоке, до старта: поток хранилище не трогает
+        self.known = store_fingerprints(store)
+
+    def run(self):
+        try:
+            records, report = import_records(
+                self.store.name, self.path, self.known,
+                self.progress.emit, self.isInterruptionRequested
+            )
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            records, report = None, {"error": str(e)}
+        self.imported.emit(self.store, records, report)
+
+
+# ===============================
+# ТАБЛИЦЫ РЕДАКТОРОВ (МОДЕЛЬ + ДЕЛЕГАТЫ)
+# ===============================
+# Таблица — лёгкое представление над списком записей; редактор
+# (QDateEdit / QTimeEdit) создаётся только для ячейки, которую
+# сейчас правят, поэтому окно открывается одинаково быстро
+# и на 10, и на 10 000 записей.
+class ReminderTableModel(QAbstractTableModel):
+    # columns: [(заголовок, вид, поле)], вид — text / date / time / int / repeat
+    # required — поле, без которого строка не сохраняется
+    def __init__(self, columns, required, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.required = required
+        self.rows = []
+
+        # Грязные строки: id(объекта записи) -> запись; удалённые — по id хранилища
+        self.dirty = {}
+        self.deleted = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+
+        record = self.rows[index.row()]
+        _, kind, field = self.columns[index.column()]
+
+        if kind == "date":
+            value = QDate(
+                to_int(record.get("year")) or 0,
+                to_int(record.get("month")) or 0,
+                to_int(record.get("day")) or 0
+            )
+            return value.toString("dd.MM.yyyy") if role == Qt.DisplayRole else value
+        if kind == "time":
+            value = QTime(to_int(record.get("hour")) or 0, to_int(record.get("minute")) or 0)
+            return value.toString("HH:mm") if role == Qt.DisplayRole else value
+        if kind == "int":
+            return to_int(record.get(field)) or 0
+        if kind == "repeat":
+            repeat = record.get(field)
+            if role == Qt.DisplayRole:
+                return repeat_text(repeat)
+            return repeat.get("freq", "") if isinstance(repeat, dict) else ""
+        return record.get(field, "")
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+
+        record = self.rows[index.row()]
+        _, kind, field = self.columns[index.column()]
+        before = dict(record)
+
+        if kind == "date":
+            record.update(day=value.day(), month=value.month(), year=value.year())
+        elif kind == "time":
+            record.update(hour=value.hour(), minute=value.minute())
+        elif kind == "int":
+            record[field] = to_int(value) or 0
+        elif kind == "repeat":
+            # Меняется только частота; интервал, until, count и
+            # пропуски правила сохраняются
+            if value in REPEAT_STEPS:
+                repeat = record.get(field)
+                repeat = dict(repeat) if isinstance(repeat, dict) else {}
+                repeat["freq"] = value
+                record[field] = repeat
+            else:
+                record.pop(field, None)
+        else:
+            record[field] = value
+
+        if record != before:
+            self.dirty[id(record)] = record
+            self.dataChanged.emit(index, index)
+        return True
+
+    def set_records(self, records):
+        # Копии: правки в таблице не должны трогать хранилище до «Сохранить»
+        self.beginResetModel()
+        self.rows = [dict(r) for r in records]
+        self.dirty = {}
+        self.deleted = []
+        self.endResetModel()
+
+    def append_record(self, record):
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(record)
+        self.dirty[id(record)] = record
+        self.endInsertRows()
+        return row
+
+    def remove_record(self, row):
+        record = self.rows[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.dirty.pop(id(record), None)
+        if record.get("id"):
+            self.deleted.append(record["id"])
+        self.endRemoveRows()
+
+    def has_changes(self):
+        return bool(self.dirty or self.deleted)
+
+    def take_changes(self):
+        # (изменённые и новые записи, id удалённых) с прошлого сохранения
+        puts = []
+        for key, record in list(self.dirty.items()):
+            if not record.get(self.required):
+                # Незаполненная строка остаётся в таблице до следующего раза
+                continue
+            if not record.get("id"):
+                record["id"] = uuid.uuid4().hex
+            puts.append(record)
+            del self.dirty[key]
+
+        deletes = self.deleted
+        self.deleted = []
+        return puts, deletes
+
+    def resort(self, records, sort_key):
+        # Переставляем только изменённые строки; остальные уже по порядку
+        moving = {id(r) for r in records}
+
+        for record in records:
+            rows = self.rows
+            src = next(i for i, r in enumerate(rows) if r is record)
+            key = sort_key(record)
+
+            # Бинарный поиск места, пропуская ещё не расставленные строки
+            lo, hi = 0, len(rows)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                probe = mid
+                while probe < hi and id(rows[probe]) in moving:
+                    probe += 1
+                if probe == hi:
+                    hi = mid
+                elif sort_key(rows[probe]) < key:
+                    lo = probe + 1
+                else:
+                    hi = mid
+
+            moving.discard(id(record))
+            if lo in (src, src + 1):
+                continue
+
+            self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), lo)
+            rows.insert(lo if lo < src else lo - 1, rows.pop(src))
+            self.endMoveRows()
+
+
+class DateDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QDateEdit(parent)
+        editor.setCalendarPopup(True)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setDate(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.date())
+
+
+class TimeDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QTimeEdit(parent)
+        editor.setDisplayFormat("HH:mm")
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setTime(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.time())
+
+
+class RepeatDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        for freq, label in REPEAT_LABELS.items():
+            editor.addItem(label, freq)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(max(0, editor.findData(index.data(Qt.EditRole))))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentData())
+
+
+def make_reminder_table(model, delegates):
+    table = QTableView()
+    table.setModel(model)
+    table.setSelectionBehavior(QAbstractItemView.SelectRows)
+    table.setSelectionMode(QAbstractItemView.SingleSelection)
+    table.setEditTriggers(
+        QAbstractItemView.DoubleClicked |
+        QAbstractItemView.SelectedClicked |
+        QAbstractItemView.EditKeyPressed
+    )
+    table.horizontalHeader().setStretchLastSection(True)
+    table.verticalHeader().setDefaultSectionSize(30)
+    for column, delegate in delegates.items():
+        table.setItemDelegateForColumn(column, delegate)
+    return table
 
 
 # ===============================
@@ -130,13 +1007,13 @@ class BirthdayWindow(QWidget):
         )
 
         self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_DeleteOnClose, True)
 
         self.setFixedSize(480, 600)
 
-        self.container = QWidget(self)
+        # Стиль — общий на приложение (theme), фон — готовая картинка
+        self.container = theme.RoundedPanel(theme.EDITOR_RADIUS, theme.EDITOR_BACKGROUND, self)
         self.container.setGeometry(0, 0, 480, 600)
-        self.container.setObjectName("container")
+        self.container.setObjectName("editor")
 
         layout = QVBoxLayout(self.container)
         layout.setSpacing(15)
@@ -148,10 +1025,11 @@ class BirthdayWindow(QWidget):
         self.btn_close.clicked.connect(self.close)
         layout.addWidget(self.btn_close, alignment=Qt.AlignRight)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["Имя", "Дата рождения"])
-        self.table.horizontalHeader().setStretchLastSection(True)
+        self.model = ReminderTableModel([
+            ("Имя", "text", "name"),
+            ("Дата рождения", "date", None),
+        ], "name", self)
+        self.table = make_reminder_table(self.model, {1: DateDelegate(self)})
         layout.addWidget(self.table)
 
         self.btn_add = QPushButton("Добавить")
@@ -166,112 +1044,72 @@ class BirthdayWindow(QWidget):
         self.btn_remove.clicked.connect(self.remove_row)
         self.btn_save.clicked.connect(self.save_data)
 
-        self.apply_style()
+        # Файлы изменились извне — обновить открытую таблицу
+        self.stale = False
+        birthday_store.subscribe_reload(self.on_store_reloaded)
+        self.destroyed.connect(
+            lambda: birthday_store.unsubscribe_reload(self.on_store_reloaded)
+        )
+
         self.load_data()
         self.show()
 
-    def apply_style(self):
-        self.setStyleSheet("""
-        QWidget#container {
-            background-color: rgba(255, 255, 255, 0.95);
-            border-radius: 20px;
-        }
-        QTableWidget {
-            background-color: white;
-            border-radius: 10px;
-            font-size: 14px;
-        }
-        QPushButton {
-            background-color: #0078D7;
-            color: white;
-            border-radius: 10px;
-            padding: 6px 12px;
-        }
-        QPushButton:hover {
-            background-color: #005ea6;
-        }
-        QPushButton#closeButton {
-            background-color: transparent;
-            color: #444;
-            font-size: 20px;
-            font-weight: bold;
-            border-radius: 20px;
-        }
-        QPushButton#closeButton:hover {
-            background-color: #e81123;
-            color: white;
-        }
-        """)
-
     def load_data(self):
-        data = load_birthdays()
-
-        today = date.today()
-
-        # 🔥 Сортировка по ближайшему ДР
-        def days_until(b):
-            try:
-                next_birthday = date(today.year, b["month"], b["day"])
-                if next_birthday < today:
-                    next_birthday = date(today.year + 1, b["month"], b["day"])
-                return (next_birthday - today).days
-            except Exception as e:
-                print("Ошибка даты:", e)
-                return float("inf")
-
-        data.sort(key=days_until)
-
-        self.table.setRowCount(len(data))
-
-        for row, b in enumerate(data):
-            name_item = QTableWidgetItem(b["name"])
-            self.table.setItem(row, 0, name_item)
-
-            date_edit = QDateEdit()
-            date_edit.setCalendarPopup(True)
-            date_edit.setDate(QDate(b["year"], b["month"], b["day"]))
-            self.table.setCellWidget(row, 1, date_edit)
+        # 🔥 Уже отсортировано по ближайшему ДР (индекс хранилища)
+        self.stale = False
+        self.loaded_on = date.today()
+        self.model.set_records(birthday_store.ordered(self.loaded_on))
+
+    def on_store_reloaded(self):
+        # Несохранённые правки не затираем: обновимся после «Сохранить»;
+        # скрытое окно обновится при следующем открытии
+        if self.model.has_changes() or not self.isVisible():
+            self.stale = True
+        else:
+            self.load_data()
+
+    def reopen(self):
+        # Окно не пересоздаётся: закрытие только прячет его.
+        # Несохранённые при закрытии правки сбрасываем, как раньше
+        if self.stale or self.model.has_changes() or self.loaded_on != date.today():
+            self.load_data()
+        self.show()
+        self.raise_()
+        self.activateWindow()
 
     def add_row(self):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        date_edit = QDateEdit()
-        date_edit.setCalendarPopup(True)
-        date_edit.setDate(QDate.currentDate())
-        self.table.setCellWidget(row, 1, date_edit)
+        today = QDate.currentDate()
+        row = self.model.append_record({
+            "name": "",
+            "day": today.day(),
+            "month": today.month(),
+            "year": today.year()
+        })
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index)
+        self.table.setCurrentIndex(index)
+        self.table.edit(index)
 
     def remove_row(self):
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row >= 0:
-            self.table.removeRow(row)
+            self.model.remove_record(row)
 
     def save_data(self):
-        data = []
-
-        for row in range(self.table.rowCount()):
-            name_item = self.table.item(row, 0)
-            if not name_item:
-                continue
-
-            name = name_item.text()
-            date_edit = self.table.cellWidget(row, 1)
-            qdate = date_edit.date()
-
-            data.append({
-                "name": name,
-                "day": qdate.day(),
-                "month": qdate.month(),
-                "year": qdate.year()
-            })
+        # Пишем только изменённые строки; без имени — не сохраняем
+        puts, deletes = self.model.take_changes()
+        written = birthday_store.apply(puts, deletes)
 
-        save_birthdays(data)
-
-        # Обновляем таблицу (пересортировка)
-        self.load_data()
+        # Пересортировка — только переставленные строки
+        today = date.today()
+        if self.stale:
+            # Пока правили, файлы перечитались — показываем итог целиком
+            self.load_data()
+        else:
+            self.model.resort(puts, lambda b: birthday_store.index.sort_key(b, today))
 
         # 🔥 Мягкое подтверждение
-        self.btn_save.setText("✔ Сохранено")
+        self.btn_save.setText(f"✔ Сохранено: {written}")
         self.btn_save.setEnabled(False)
 
         QTimer.singleShot(1500, self.restore_save_button)
@@ -312,13 +1150,12 @@ class EventWindow(QWidget):
         )
 
         self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_DeleteOnClose, True)
 
         self.setFixedSize(500, 620)
 
-        self.container = QWidget(self)
+        self.container = theme.RoundedPanel(theme.EDITOR_RADIUS, theme.EDITOR_BACKGROUND, self)
         self.container.setGeometry(0, 0, 500, 620)
-        self.container.setObjectName("container")
+        self.container.setObjectName("editor")
 
         layout = QVBoxLayout(self.container)
         layout.setSpacing(15)
@@ -329,12 +1166,18 @@ class EventWindow(QWidget):
         self.btn_close.clicked.connect(self.close)
         layout.addWidget(self.btn_close, alignment=Qt.AlignRight)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(
-            ["Название", "Дата", "Время", "Напомнить (дней)"]
-        )
-        self.table.horizontalHeader().setStretchLastSection(True)
+        self.model = ReminderTableModel([
+            ("Название", "text", "title"),
+            ("Дата", "date", None),
+            ("Время", "time", None),
+            ("Повтор", "repeat", "repeat"),
+            ("Напомнить (дней)", "int", "remind_before"),
+        ], "title", self)
+        self.table = make_reminder_table(self.model, {
+            1: DateDelegate(self),
+            2: TimeDelegate(self),
+            3: RepeatDelegate(self),
+        })
         layout.addWidget(self.table)
 
         self.btn_add = QPushButton("Добавить")
@@ -349,126 +1192,70 @@ class EventWindow(QWidget):
         self.btn_remove.clicked.connect(self.remove_row)
         self.btn_save.clicked.connect(self.save_data)
 
-        self.apply_style()
+        # Файлы изменились извне — обновить открытую таблицу
+        self.stale = False
+        event_store.subscribe_reload(self.on_store_reloaded)
+        self.destroyed.connect(
+            lambda: event_store.unsubscribe_reload(self.on_store_reloaded)
+        )
+
         self.load_data()
         self.show()
 
-    def apply_style(self):
-        self.setStyleSheet("""
-        QWidget#container {
-            background-color: rgba(255, 255, 255, 0.95);
-            border-radius: 20px;
-        }
-        QTableWidget {
-            background-color: white;
-            border-radius: 10px;
-            font-size: 14px;
-        }
-        QPushButton {
-            background-color: #0078D7;
-            color: white;
-            border-radius: 10px;
-            padding: 6px 12px;
-        }
-        QPushButton:hover {
-            background-color: #005ea6;
-        }
-        """)
-
     def load_data(self):
-        data = load_events()
-
-        today = date.today()
-
-        # 🔥 Сортировка по ближайшему событию
-        def days_until(e):
-            try:
-                event_date = date(e["year"], e["month"], e["day"])
-                return (event_date - today).days if event_date >= today else 9999
-            except:
-                return 9999
-
-        data.sort(key=days_until)
-
-        self.table.setRowCount(len(data))
-
-        for row, e in enumerate(data):
-
-            self.table.setItem(row, 0, QTableWidgetItem(e["title"]))
-
-            date_edit = QDateEdit()
-            date_edit.setCalendarPopup(True)
-            date_edit.setDate(QDate(e["year"], e["month"], e["day"]))
-            self.table.setCellWidget(row, 1, date_edit)
-
-            time_edit = QTimeEdit()
-            time_edit.setDisplayFormat("HH:mm")
-            time_edit.setTime(QTime(e.get("hour", 0), e.get("minute", 0)))
-            self.table.setCellWidget(row, 2, time_edit)
-
-            remind_item = QTableWidgetItem(str(e.get("remind_before", 0)))
-            self.table.setItem(row, 3, remind_item)
+        # 🔥 Уже отсортировано по ближайшему событию (индекс хранилища)
+        self.stale = False
+        self.loaded_on = date.today()
+        self.model.set_records(event_store.ordered(self.loaded_on))
+
+    def on_store_reloaded(self):
+        if self.model.has_changes() or not self.isVisible():
+            self.stale = True
+        else:
+            self.load_data()
+
+    def reopen(self):
+        if self.stale or self.model.has_changes() or self.loaded_on != date.today():
+            self.load_data()
+        self.show()
+        self.raise_()
+        self.activateWindow()
 
     def add_row(self):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        # Дата
-        date_edit = QDateEdit()
-        date_edit.setCalendarPopup(True)
-        date_edit.setDate(QDate.currentDate())
-        self.table.setCellWidget(row, 1, date_edit)
-
-        # Время
-        time_edit = QTimeEdit()
-        time_edit.setDisplayFormat("HH:mm")
-        time_edit.setTime(QTime.currentTime())
-        self.table.setCellWidget(row, 2, time_edit)
-
-        # Напоминание
-        self.table.setItem(row, 3, QTableWidgetItem("0"))
+        today = QDate.currentDate()
+        now = QTime.currentTime()
+        row = self.model.append_record({
+            "title": "",
+            "day": today.day(),
+            "month": today.month(),
+            "year": today.year(),
+            "hour": now.hour(),
+            "minute": now.minute(),
+            "remind_before": 0
+        })
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index)
+        self.table.setCurrentIndex(index)
+        self.table.edit(index)
 
     def remove_row(self):
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row >= 0:
-            self.table.removeRow(row)
+            self.model.remove_record(row)
 
     def save_data(self):
-        data = []
-
-        for row in range(self.table.rowCount()):
-            title_item = self.table.item(row, 0)
-            remind_item = self.table.item(row, 3)
-
-            if not title_item:
-                continue
-
-            title = title_item.text()
-            remind_before = int(remind_item.text()) if remind_item else 0
-
-            date_edit = self.table.cellWidget(row, 1)
-            qdate = date_edit.date()
-
-            time_edit = self.table.cellWidget(row, 2)
-            qtime = time_edit.time()
-
-            data.append({
-                "title": title,
-                "day": qdate.day(),
-                "month": qdate.month(),
-                "year": qdate.year(),
-                "hour": qtime.hour(),
-                "minute": qtime.minute(),
-                "remind_before": remind_before
-            })
-
-        save_events(data)
+        puts, deletes = self.model.take_changes()
+        written = event_store.apply(puts, deletes)
 
         # пересортировка
-        self.load_data()
+        today = date.today()
+        if self.stale:
+            self.load_data()
+        else:
+            self.model.resort(puts, lambda e: event_store.index.sort_key(e, today))
 
         # мягкое подтверждение как у ДР
-        self.btn_save.setText("✔ Сохранено")
+        self.btn_save.setText(f"✔ Сохранено: {written}")
         self.btn_save.setEnabled(False)
 
         QTimer.singleShot(1500, self.restore_save_button)
@@ -495,76 +1282,427 @@ class EventWindow(QWidget):
     def mouseReleaseEvent(self, event):
         self.dragging = False
 
+# ===============================
+# ОБЩЕЕ ОКНО (ОВЕРЛЕЙ)
+# ===============================
+# Необязательный режим: вместо отдельного полупрозрачного окна на
+# каждого питомца и уведомление — одно прозрачное окно на весь экран,
+# а они в нём дочерние виджеты. Композитор системы смешивает одно
+# окно; Qt рисует всех в один буфер. Маска окна — только там, где
+# кто-то есть (у питомцев — по непрозрачным пикселям анимации),
+# остальной экран кликается насквозь.
+class Overlay(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Tool
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setGeometry(QApplication.primaryScreen().geometry())
+
+        self.sprites = []
+        self.mask_pending = False
+
+    def adopt(self, widget):
+        # widget становится дочерним: без своего окна и своих флагов
+        widget.setParent(self)
+        widget.installEventFilter(self)
+        self.sprites.append(widget)
+
+    def eventFilter(self, watched, event):
+        # *ToParent приходят и пока оверлей скрыт — по ним он и появляется
+        if event.type() in (QEvent.ShowToParent, QEvent.HideToParent,
+                            QEvent.Move, QEvent.Resize):
+            self.schedule_mask()
+        return False
+
+    def schedule_mask(self):
+        # Много перемещений за один проход цикла — одна новая маска
+        if not self.mask_pending:
+            self.mask_pending = True
+            QTimer.singleShot(0, self.refresh_mask)
+
+    def refresh_mask(self):
+        self.mask_pending = False
+
+        region = QRegion()
+        for widget in self.sprites:
+            if widget.isVisibleTo(self):
+                region += self.sprite_region(widget)
+
+        # Пустая маска в Qt означает «без маски» — тогда просто прячемся
+        if region.isEmpty():
+            self.hide()
+            return
+
+        self.setMask(region)
+        if not self.isVisible():
+            self.show()
+
+    def sprite_region(self, widget):
+        # Питомцы — по маске анимации, уведомления — прямоугольником
+        if isinstance(widget, Pet):
+            return widget.sprite_region().translated(widget.pos())
+        return QRegion(widget.geometry())
+
+    def map_from_screen(self, point):
+        return point - self.geometry().topLeft()
+
+    # ✅ Как и у питомца: закрытие окна — выход
+    def closeEvent(self, event):
+        QApplication.quit()
+
+
 # ===============================
 # TOAST
 # ===============================
+# Уведомления — небольшой пул заранее собранных окон. Новые
+# сообщения встают в очередь, видно не больше toast_max_visible
+# штук стопкой над правым нижним углом; большая пачка режется на
+# страницы по toast_page_size. Стиль и фоны — из theme.
+TOAST_WIDTH = 350
+TOAST_MIN_HEIGHT = 120
+TOAST_MARGIN = 20
+TOAST_GAP = 10
+
 class ToastNotification(QWidget):
-    def __init__(self, text):
+    def __init__(self, manager):
         super().__init__()
+        self.manager = manager
+
+        if manager.overlay is not None:
+            manager.overlay.adopt(self)
+        else:
+            self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+            self.setAttribute(Qt.WA_TranslucentBackground)
+            self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setFixedWidth(TOAST_WIDTH)
+
+        # Фон рисует вложенный контейнер готовой картинкой из кэша
+        self.container = theme.RoundedPanel(
+            theme.TOAST_RADIUS, theme.TOAST_BACKGROUNDS["birthday"], self
+        )
+        self.container.setObjectName("toast")
 
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.resize(350, 120)
+        outer = QVBoxLayout(self)
+        outer.setContentsMargins(0, 0, 0, 0)
+        outer.addWidget(self.container)
 
-        layout = QVBoxLayout(self)
+        layout = QVBoxLayout(self.container)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        label = QLabel(text)
-        label.setWordWrap(True)
-        label.setAlignment(Qt.AlignCenter)
-        label.setStyleSheet("color: white; font-size: 14px;")
-        layout.addWidget(label)
+        self.label = QLabel()
+        self.label.setWordWrap(True)
+        self.label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.label)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.dismiss)
 
-        self.setStyleSheet("""
-            QWidget {
-                background-color: rgba(40, 40, 40, 230);
-                border-radius: 15px;
-            }
-        """)
+    def present(self, kind, text, seconds):
+        self.container.set_color(theme.TOAST_BACKGROUNDS[kind])
+        self.label.setText(text)
+        self.adjustSize()
+        self.resize(TOAST_WIDTH, max(TOAST_MIN_HEIGHT, self.sizeHint().height()))
 
+        self.timer.start(seconds * 1000)
+
+    def dismiss(self):
+        self.timer.stop()
+        self.hide()
+        self.manager.release(self)
+
+    def mousePressEvent(self, event):
+        # Клик закрывает уведомление раньше времени
+        self.dismiss()
+
+
+class ToastManager:
+    def __init__(self, settings, overlay=None):
+        self.overlay = overlay
+        self.max_visible = max(1, int(settings["toast_max_visible"]))
+        self.page_size = max(1, int(settings["toast_page_size"]))
+        self.seconds = max(1, int(settings["toast_seconds"]))
+
+        self.pool = []
+        self.visible = []
+        self.queue = deque()
+
+    def show_messages(self, kind, messages, separator="\n\n"):
+        pages = [
+            messages[i:i + self.page_size]
+            for i in range(0, len(messages), self.page_size)
+        ]
+        for number, page in enumerate(pages, 1):
+            text = separator.join(page)
+            if len(pages) > 1:
+                text += f"\n\n({number}/{len(pages)})"
+            self.queue.append((kind, text))
+        self.pump()
+
+    def pump(self):
         screen = QApplication.primaryScreen().availableGeometry()
-        self.move(
-            screen.right() - self.width() - 20,
-            screen.bottom() - self.height() - 20
-        )
+        used = sum(t.height() + TOAST_GAP for t in self.visible)
 
-        self.show()
-        QTimer.singleShot(6000, self.close)
+        while self.queue and len(self.visible) < self.max_visible:
+            kind, text = self.queue[0]
 
-class EventToastNotification(QWidget):
-    def __init__(self, text):
-        super().__init__()
+            toast = self.pool.pop() if self.pool else ToastNotification(self)
+            toast.present(kind, text, self.seconds)
 
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.resize(350, 120)
+            # Стопка не вылезает за верх экрана — остальное подождёт
+            if self.visible and used + toast.height() > screen.height() - 2 * TOAST_MARGIN:
+                toast.timer.stop()
+                self.pool.append(toast)
+                break
 
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(20, 20, 20, 20)
+            self.queue.popleft()
+            self.visible.append(toast)
+            used += toast.height() + TOAST_GAP
 
-        label = QLabel(text)
-        label.setWordWrap(True)
-        label.setAlignment(Qt.AlignCenter)
-        label.setStyleSheet("color: white; font-size: 14px;")
-        layout.addWidget(label)
+        self.restack()
 
-        self.setStyleSheet("""
-            QWidget {
-                background-color: rgba(30, 90, 160, 230);
-                border-radius: 15px;
-            }
-        """)
+    def release(self, toast):
+        if toast in self.visible:
+            self.visible.remove(toast)
+            self.pool.append(toast)
+        self.pump()
 
+    def restack(self):
+        # Самое старое — внизу, новые — выше
         screen = QApplication.primaryScreen().availableGeometry()
+        bottom = screen.bottom() - TOAST_MARGIN
+
+        for toast in self.visible:
+            top = bottom - toast.height()
+            point = QPoint(screen.right() - toast.width() - TOAST_MARGIN, top)
+            if self.overlay is not None:
+                point = self.overlay.map_from_screen(point)
+            toast.move(point)
+            if toast.isHidden():
+                toast.show()
+            bottom = top - TOAST_GAP
+
+
+# ===============================
+# ДИАГНОСТИКА
+# ===============================
+# Включается настройкой "diagnostics". Выключенная ничего не стоит:
+# функции не обёрнуты, у часов нет зонда, таймеров и пункта меню нет.
+# Включённая оборачивает замером времени чтение и запись хранилищ и
+# файлов, update_frame и конструкторы окон, считает опоздания тиков часов и
+# раз в diagnostics_dump_s пишет снимок в diagnostics.json.
+LATE_FRAME_MS = 16
+JITTER_SAMPLES = 1000
+
+DIAGNOSTICS_TARGETS = (
+    "load_last_check", "save_last_check",
+    "load_events_last_check", "save_events_last_check",
+)
+# Классы этого модуля
+DIAGNOSTICS_METHODS = (
+    ("Pet", "update_frame"),
+    ("BirthdayWindow", "__init__"),
+    ("EventWindow", "__init__"),
+    ("ReminderScheduler", "rebuild"),
+)
+# Классы reminders
+DIAGNOSTICS_REMINDERS_METHODS = (
+    ("ReminderStore", "load"),
+    ("ReminderStore", "read_disk"),
+    ("ReminderStore", "reload"),
+    ("ReminderStore", "all"),
+    ("ReminderStore", "apply"),
+    ("ReminderStore", "put_many"),
+    ("FileWriter", "write_atomic"),
+    ("FileWriter", "write_append"),
+    ("FileWriter", "flush"),
+)
+
+
+class Diagnostics:
+    def __init__(self, pet):
+        self.pet = pet
+        self.started = time.perf_counter()
+        # имя -> [вызовов, всего мс, максимум мс]
+        self.calls = {}
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+        self.jitter = deque(maxlen=JITTER_SAMPLES)
+
+    # ---------- замеры ----------
+    def wrap(self, name, func):
+        calls = self.calls.setdefault(name, [0, 0.0, 0.0])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - started) * 1000
+                calls[0] += 1
+                calls[1] += ms
+                if ms > calls[2]:
+                    calls[2] = ms
+
+        timed.__wrapped__ = func
+        return timed
+
+    def instrument(self):
+        module = sys.modules[__name__]
+        for name in DIAGNOSTICS_TARGETS:
+            # Функции живут в reminders, вызываются и оттуда, и отсюда
+            timed = self.wrap(name, getattr(reminders, name))
+            setattr(reminders, name, timed)
+            setattr(module, name, timed)
+        for owner, methods in ((module, DIAGNOSTICS_METHODS), (reminders, DIAGNOSTICS_REMINDERS_METHODS)):
+            for class_name, method in methods:
+                cls = getattr(owner, class_name)
+                setattr(cls, method, self.wrap(f"{class_name}.{method}", getattr(cls, method)))
+
+    def on_tick(self, clock, now):
+        # Насколько позже срока проснулся таймер
+        if clock.armed_for is None:
+            return
+        late = now - clock.armed_for
+        self.ticks += 1
+        self.jitter.append(late)
+
+        if late > LATE_FRAME_MS:
+            self.late += 1
+            intervals = [clock.interval(p) for p in clock.pets if p.active]
+            if intervals:
+                self.dropped += int(late // min(intervals))
+
+    # ---------- снимок ----------
+    def snapshot(self, key=None):
+        # key — кто читает: у панели и дампа свои интервалы замера
+        jitter = sorted(self.jitter)
+        pets = [self.pet] + self.pet.companions
+        cache = self.pet.frames.cache
+        app = QApplication.instance()
+
+        return {
+            "uptime_s": round(time.perf_counter() - self.started),
+            "startup_ms": dict(self.pet.startup_timings),
+            "ticks": {
+                "count": self.ticks,
+                "late": self.late,
+                "dropped_frames": self.dropped,
+                "jitter_mean_ms": round(sum(jitter) / len(jitter), 2) if jitter else 0,
+                "jitter_p95_ms": round(jitter[int(len(jitter) * 0.95)], 2) if jitter else 0,
+                "jitter_max_ms": round(jitter[-1], 2) if jitter else 0,
+                "wakeups_per_minute": self.pet.clock.wakeups_per_minute(key),
+            },
+            "repaint_px_per_s": [p.repaint_rate(key) for p in pets],
+            "pixmaps": {
+                "cached_bytes": cache.bytes,
+                "budget_bytes": cache.budget,
+                "cached_frames": len(cache.items),
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "backgrounds": len(theme.backgrounds),
+            },
+            "widgets": {
+                "all": len(app.allWidgets()),
+                "top_level": len(app.topLevelWidgets()),
+                "visible_windows": sum(w.isVisible() for w in app.topLevelWidgets()),
+                "toasts_pool": len(self.pet.toasts.pool) + len(self.pet.toasts.visible),
+                "toasts_queued": len(self.pet.toasts.queue),
+            },
+            "calls_ms": {
+                name: {
+                    "count": count,
+                    "mean": round(total / count, 3) if count else 0,
+                    "max": round(peak, 3),
+                }
+                for name, (count, total, peak) in sorted(self.calls.items())
+            },
+            "writes": writer.stats,
+        }
+
+    def dump(self):
+        # Снимок перезаписывается целиком, резервные копии ему не нужны
+        try:
+            writer.write_atomic(
+                data_path("diagnostics.json"),
+                json_bytes(self.snapshot("dump"), indent=2),
+                backups=0
+            )
+        except OSError as e:
+            print("Не удалось сохранить диагностику:", e)
+
+
+class DiagnosticsWindow(QWidget):
+    def __init__(self, diagnostics):
+        super().__init__(None)
+        self.diagnostics = diagnostics
 
-        # 🔥 Выше окна ДР (смещение вверх)
-        self.move(
-            screen.right() - self.width() - 20,
-            screen.bottom() - self.height() - 160
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.Window |
+            Qt.WindowStaysOnTopHint
         )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setFixedSize(460, 560)
 
-        self.show()
-        QTimer.singleShot(6000, self.close)
+        self.container = theme.RoundedPanel(theme.EDITOR_RADIUS, theme.EDITOR_BACKGROUND, self)
+        self.container.setGeometry(0, 0, 460, 560)
+        self.container.setObjectName("editor")
+
+        layout = QVBoxLayout(self.container)
+        layout.setContentsMargins(25, 25, 25, 25)
+
+        self.btn_close = QPushButton("✕")
+        self.btn_close.setFixedSize(40, 40)
+        self.btn_close.setObjectName("closeButton")
+        self.btn_close.clicked.connect(self.close)
+        layout.addWidget(self.btn_close, alignment=Qt.AlignRight)
+
+        self.text = QLabel()
+        self.text.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.text.setStyleSheet("font-family: Consolas, monospace; font-size: 12px;")
+        layout.addWidget(self.text, 1)
+
+        # Обновляется только пока окно открыто
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.VeryCoarseTimer)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        self.text.setText(json.dumps(
+            self.diagnostics.snapshot("panel"), ensure_ascii=False, indent=1
+        ))
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
+            self.dragging = True
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if getattr(self, "dragging", False) and event.buttons() == Qt.LeftButton:
+            self.move(event.globalPos() - self.drag_position)
+            event.accept()
+
+    def mouseReleaseEvent(self, event):
+        self.dragging = False
 
 
 # ===============================
@@ -572,17 +1710,160 @@ class EventToastNotification(QWidget):
 # ===============================
 class Pet(QLabel):
 
-    def __init__(self):
+    # primary — главный питомец; без него этот питомец и есть главный:
+    # у него трей, уведомления, напоминания и окна, а кадры и часы
+    # анимации он делит со всеми остальными
+    def __init__(self, primary=None):
         super().__init__()
 
-        self.setWindowFlags(
-            Qt.FramelessWindowHint |
-            Qt.WindowStaysOnTopHint |
-            Qt.Tool
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.primary = primary
+        self.companions = []
+
+        if primary is None:
+            self.create_tray()
+            self.startup_timings = {"tray": elapsed_ms()}
+            self.settings = load_settings()
+
+            # 🩺 Замеры ставятся до первого обращения к хранилищам и
+            # таймерам, иначе первые загрузки пройдут мимо счётчиков
+            self.diagnostics = None
+            self.diagnostics_window = None
+            if self.settings.get("diagnostics"):
+                self.diagnostics = Diagnostics(self)
+                self.diagnostics.instrument()
+
+            # Серии сохранений сливаются в одну запись
+            writer.schedule_timer = QTimer.singleShot
+            QApplication.instance().aboutToQuit.connect(writer.flush)
+
+            self.overlay = Overlay() if self.settings["overlay"] else None
+            self.frames = SharedFrames(self.settings)
+            self.clock = AnimationClock(self.settings["sleep_frame_ms"])
+            self.toasts = ToastManager(self.settings, self.overlay)
+
+            # Стиль разбирается один раз на процесс; окна редакторов живут
+            # до выхода и открываются повторно без пересборки
+            theme.install(QApplication.instance())
+            self.birthday_window = None
+            self.events_window = None
+            self.importer = None
+        else:
+            self.settings = primary.settings
+            self.overlay = primary.overlay
+            self.frames = primary.frames
+            self.clock = primary.clock
+
+        if self.overlay is not None:
+            self.overlay.adopt(self)
+        else:
+            self.setWindowFlags(
+                Qt.FramelessWindowHint |
+                Qt.WindowStaysOnTopHint |
+                Qt.Tool
+            )
+            self.setAttribute(Qt.WA_TranslucentBackground)
+
+        self.dragging = False
+        self.moved = False
+        self.offset = QPoint()
+
+        # Синхронно — только idle и его первый кадр, остальное в фоне
+        self.idle_frames = self.frames.acquire("idle_clean", sync=True)
+        self.click_frames = self.frames.acquire("click_clean")
+        self.sleep_frames = self.frames.acquire("sleeping_clean")
+
+        # 🔴 Защита от пустых кадров
+        if not self.idle_frames:
+            QMessageBox.critical(
+                None,
+                "Ошибка",
+                "Не найдены кадры idle_clean.\nПроверь сборку PyInstaller."
+            )
+            sys.exit(1)
+
+        self.current_frames = self.idle_frames
+        self.frame_index = 0
+        self.playing_click = False
+        self.sleeping = False
+
+        # Своих таймеров у питомца нет: только сроки для общих часов.
+        # Засыпание — через sleep_after секунд без взаимодействия
+        self.sleep_after = self.settings["sleep_after"]
+        self.active = False
+        self.frame_due = 0
+        self.sleep_due = None
+        self.behavior_due = None
+
+        # Что сейчас на экране: кадр и (анимация, индекс) для дельт
+        self.frame = self.idle_frames[0]
+        self.shown = (self.idle_frames, 0)
+        self.resize(self.frame.size())
+
+        # Счётчик перерисованных пикселей (для профилирования)
+        self.repaint_pixels = 0
+        self.repaint_marks = {}
+        self.repaint_started = time.perf_counter()
+
+        # Клики сквозь прозрачные места: маска окна по анимации
+        self.mask_source = None
+        self.apply_mask()
 
-        # === TRAY ===
+        # Часы двигают питомца между showEvent и hideEvent
+        self.clock.add(self)
+
+        if primary is not None:
+            return
+
+        self.show()
+        self.startup_timings["first_frame"] = elapsed_ms()
+
+        # Остальные питомцы — на тех же кадрах и часах
+        for number in range(1, int(self.settings["pet_count"])):
+            companion = Pet(self)
+            companion.move(self.pos() + QPoint(number * (self.width() + 20), 0))
+            companion.show()
+            self.companions.append(companion)
+
+        self.frames.start_loader()
+        self.frames.loader.finished.connect(self.on_frames_loaded)
+
+        # Файлы с напоминаниями читаем уже после показа питомца
+        QTimer.singleShot(0, self.check_birthdays_once)
+        QTimer.singleShot(2000, self.show_next_birthday)
+
+        # 🔔 События — по расписанию, а не только при запуске
+        self.reminders = ReminderScheduler(self)
+        QTimer.singleShot(0, lambda: self.reminders.rebuild())
+
+        # Правки файлов другим процессом (синхронизация папки)
+        self.store_watcher = StoreWatcher([birthday_store, event_store], self)
+        QApplication.instance().aboutToQuit.connect(self.store_watcher.stop)
+
+        if self.diagnostics is not None:
+            self.start_diagnostics()
+
+    def start_diagnostics(self):
+        self.clock.probe = self.diagnostics
+
+        # Пункт меню появляется только вместе с замерами
+        action = QAction("🩺 Диагностика", self)
+        action.triggered.connect(self.open_diagnostics_window)
+        self.tray_menu.insertAction(self.tray_menu.actions()[-1], action)
+
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.setTimerType(Qt.VeryCoarseTimer)
+        self.diagnostics_timer.timeout.connect(self.diagnostics.dump)
+        self.diagnostics_timer.start(max(1, int(self.settings["diagnostics_dump_s"])) * 1000)
+        QApplication.instance().aboutToQuit.connect(self.diagnostics.dump)
+
+    def open_diagnostics_window(self):
+        if self.diagnostics_window is None:
+            self.diagnostics_window = DiagnosticsWindow(self.diagnostics)
+        self.diagnostics_window.show()
+        self.diagnostics_window.raise_()
+        self.diagnostics_window.activateWindow()
+
+    def create_tray(self):
         self.tray = QSystemTrayIcon(self)
 
         icon_path = os.path.join(base_path, "icon.ico")
@@ -598,6 +1879,14 @@ class Pet(QLabel):
         nearest_action = QAction("🔔 Показать ближайший ДР", self)
         events_action = QAction("🗓 События", self)
 
+        # Импорт/экспорт — отдельным подменю, по пункту на хранилище
+        transfer_menu = QMenu("📂 Импорт / экспорт", self.tray_menu)
+        for store, label in ((birthday_store, "дни рождения"), (event_store, "события")):
+            import_action = transfer_menu.addAction(f"📥 Импортировать {label}…")
+            export_action = transfer_menu.addAction(f"📤 Экспортировать {label}…")
+            import_action.triggered.connect(lambda _, s=store: self.import_file(s))
+            export_action.triggered.connect(lambda _, s=store: self.export_file(s))
+
         version_action = QAction("Pet Reminder v9.0", self)
         version_action.setEnabled(False)
 
@@ -611,14 +1900,15 @@ class Pet(QLabel):
         self.tray_menu.addAction(birthdays_action)
         self.tray_menu.addAction(nearest_action)
         self.tray_menu.addAction(events_action)
+        self.tray_menu.addMenu(transfer_menu)
         self.tray_menu.addSeparator()
 
         self.tray_menu.addAction(version_action)
         self.tray_menu.addAction(exit_action)
 
         # Подключаем действия
-        show_action.triggered.connect(self.show)
-        hide_action.triggered.connect(self.hide)
+        show_action.triggered.connect(self.show_all)
+        hide_action.triggered.connect(self.hide_all)
         birthdays_action.triggered.connect(self.open_birthday_window)
         events_action.triggered.connect(self.open_events_window)
         nearest_action.triggered.connect(self.show_next_birthday)
@@ -626,86 +1916,74 @@ class Pet(QLabel):
 
         self.tray.setContextMenu(self.tray_menu)
         self.tray.show()
-        # === КОНЕЦ TRAY ===
-
-        self.dragging = False
-        self.moved = False
-        self.offset = QPoint()
-
-        self.idle_frames = self.load_frames("idle_clean")
-        self.click_frames = self.load_frames("click_clean")
-        self.sleep_frames = self.load_frames("sleeping_clean")
 
-        # 🔴 Защита от пустых кадров
-        if not self.idle_frames:
-            QMessageBox.critical(
-                None,
-                "Ошибка",
-                "Не найдены кадры idle_clean.\nПроверь сборку PyInstaller."
-            )
-            sys.exit(1)
-
-        self.current_frames = self.idle_frames
-        self.frame_index = 0
-        self.playing_click = False
-        self.sleeping = False
-
-        self.last_interaction_time = time.time()
-        self.sleep_after = 10
+    def show_all(self):
+        for pet in [self] + self.companions:
+            pet.show()
 
-        first = self.idle_frames[0]
-        self.setPixmap(first)
-        self.resize(first.size())
+    def hide_all(self):
+        for pet in [self] + self.companions:
+            pet.hide()
 
-        self.anim_timer = QTimer()
-        self.anim_timer.timeout.connect(self.update_frame)
-        self.anim_timer.start(33)
-
-        self.behavior_timer = QTimer()
-        self.behavior_timer.timeout.connect(self.random_behavior)
-        self.behavior_timer.start(random.randint(3000, 6000))
-
-        self.check_birthdays_once()
-        QTimer.singleShot(2000, self.show_next_birthday)
-
-        # 🔔 Проверка событий при запуске
-        self.check_events_once()
-
-        self.show()
-    
+    def on_frames_loaded(self):
+        # Маски всех кадров готовы — точные маски окон
+        for pet in [self] + self.companions:
+            pet.apply_mask()
 
+        # Время запуска — часть диагностики, в обычном режиме молчим
+        self.startup_timings["all_frames"] = elapsed_ms()
+        if self.diagnostics is None:
+            return
+        print(
+            "⏱ Запуск: трей {tray} мс, первый кадр {first_frame} мс, "
+            "все кадры {all_frames} мс".format(**self.startup_timings)
+        )
 
     # ✅ Полное закрытие процесса
     def closeEvent(self, event):
+        if self.primary is not None:
+            # Закрыли второстепенного — уходит только он
+            self.retire()
+            super().closeEvent(event)
+            return
         QApplication.quit()
         sys.exit(0)
 
-    def load_frames(self, folder):
-        frames = []
-        folder_path = os.path.join(base_path, folder)
-
-        if not os.path.exists(folder_path):
-            return frames
-
-        for file in sorted(os.listdir(folder_path)):
-            if file.endswith(".png"):
-                frames.append(QPixmap(os.path.join(folder_path, file)))
-
-        return frames
-
-    # дальше весь твой код БЕЗ ИЗМЕНЕНИЙ
+    def retire(self):
+        # Отдаём общие кадры и уходим с часов
+        self.active = False
+        self.clock.remove(self)
+        for frames in (self.idle_frames, self.click_frames, self.sleep_frames):
+            self.frames.release(frames.name)
+        if self in self.primary.companions:
+            self.primary.companions.remove(self)
 
     def update_frame(self):
         if not self.current_frames:
             return
 
-        if not self.sleeping and time.time() - self.last_interaction_time > self.sleep_after:
-            self.start_sleep()
-
-        frame = self.current_frames[self.frame_index]
-
-        self.setPixmap(frame)
-        self.resize(frame.size())
+        frames = self.current_frames
+        index = self.frame_index
+        frame = frames[index]
+
+        prev_frames, prev_index = self.shown
+        if frame.size() != self.size():
+            self.resize(frame.size())
+            rect = self.rect()
+        elif prev_frames is frames and (prev_index + 1) % len(frames) == index:
+            rect = frames.dirty_rect(index)
+        else:
+            # Смена анимации — кадр целиком
+            rect = self.rect()
+
+        if frames is not self.mask_source:
+            self.apply_mask()
+
+        self.frame = frame
+        self.shown = (frames, index)
+        if rect is not None:
+            self.repaint_pixels += rect.width() * rect.height()
+            self.update(rect)
 
         self.frame_index += 1
         if self.frame_index >= len(self.current_frames):
@@ -714,10 +1992,85 @@ class Pet(QLabel):
                 self.playing_click = False
                 self.current_frames = self.idle_frames
 
+        self.current_frames.prefetch(self.frame_index, self.frames.prefetch)
+
+    def paintEvent(self, event):
+        # Рисуем только грязный прямоугольник, остальное окно не трогаем.
+        # В оверлее Qt сам очищает область, а питомцы могут перекрываться —
+        # там обычное наложение
+        rect = event.rect()
+        painter = QPainter(self)
+        if self.overlay is None:
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(rect, self.frame, rect)
+        painter.end()
+
+    def hit(self, pos):
+        # Клик по прозрачному месту кадра — мимо питомца (бит маски, O(1))
+        if not self.rect().contains(pos):
+            return False
+        frames, index = self.shown
+        return bits_hit(frames.mask_bits(index), pos.x(), pos.y())
+
+    def sprite_region(self):
+        # Маска окна — объединение по анимации: пересчитывается только
+        # при смене анимации, а не на каждом кадре
+        region = self.current_frames.mask_region()
+        return region if region is not None else QRegion(self.rect())
+
+    def apply_mask(self):
+        self.mask_source = self.current_frames
+        if self.overlay is not None:
+            self.overlay.schedule_mask()
+        else:
+            self.setMask(self.sprite_region())
+
+    def repaint_rate(self, key=None):
+        # Пикселей в секунду с прошлого вызова с тем же key
+        now = time.perf_counter()
+        then, pixels = self.repaint_marks.get(key, (self.repaint_started, 0))
+        self.repaint_marks[key] = (now, self.repaint_pixels)
+        if now <= then:
+            return 0
+        return round((self.repaint_pixels - pixels) / (now - then))
+
+    def showEvent(self, event):
+        self.frame_due = self.clock.next_due()
+        self.active = True
+        self.schedule_behavior()
+        if not self.sleeping:
+            self.arm_sleep()
+        self.clock.schedule()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # В трее анимация не нужна — ни одного пробуждения
+        self.active = False
+        self.behavior_due = None
+        self.sleep_due = None
+        self.clock.schedule()
+        super().hideEvent(event)
+
+    def run_timers(self, now):
+        # Вызывается часами: сработали ли засыпание и случайное действие
+        if self.sleep_due is not None and self.sleep_due <= now:
+            self.sleep_due = None
+            self.start_sleep()
+        if self.behavior_due is not None and self.behavior_due <= now:
+            self.behavior_due = None
+            self.random_behavior()
+
+    def arm_sleep(self):
+        self.sleep_due = clock_ms() + self.sleep_after * 1000
+
+    def schedule_behavior(self):
+        if not self.sleeping and self.active:
+            self.behavior_due = clock_ms() + random.randint(3000, 6000)
+
     def random_behavior(self):
         if not self.sleeping and random.random() < 0.3:
             self.start_click_animation()
-        self.behavior_timer.start(random.randint(3000, 6000))
+        self.schedule_behavior()
 
     def start_click_animation(self):
         if self.click_frames:
@@ -727,33 +2080,48 @@ class Pet(QLabel):
             self.sleeping = False
 
     def start_sleep(self):
+        if self.sleeping:
+            return
         if self.sleep_frames:
             self.current_frames = self.sleep_frames
             self.frame_index = 0
             self.sleeping = True
             self.playing_click = False
+            self.behavior_due = None
+        else:
+            # Кадры сна ещё грузятся — попробуем позже
+            self.arm_sleep()
 
     def wake_up(self):
         self.sleeping = False
         self.current_frames = self.idle_frames
         self.frame_index = 0
+        # Спящий менял кадры реже — следующий кадр на ближайшем тике
+        self.frame_due = min(self.frame_due, self.clock.next_due())
+        self.clock.schedule()
+        self.schedule_behavior()
 
     def mousePressEvent(self, event):
+        if not self.hit(event.pos()):
+            event.ignore()
+            return
         if event.button() == Qt.LeftButton:
             self.dragging = True
             self.moved = False
             self.offset = event.globalPos() - self.pos()
-            self.last_interaction_time = time.time()
+            self.arm_sleep()
             if self.sleeping:
                 self.wake_up()
 
     def mouseMoveEvent(self, event):
+        self.arm_sleep()
         if self.dragging:
             self.moved = True
             self.move(event.globalPos() - self.offset)
 
     def mouseReleaseEvent(self, event):
-        if not self.moved:
+        # Нажатие мимо питомца ушло насквозь — и отпускание не наше
+        if self.dragging and not self.moved:
             self.start_click_animation()
         self.dragging = False
 
@@ -765,125 +2133,124 @@ class Pet(QLabel):
         if last_check.get("date") == today_str:
             return
 
-        birthdays = load_birthdays()
-        messages = []
-
-        for b in birthdays:
-            try:
-                b_day = int(b["day"])
-                b_month = int(b["month"])
-                b_year = int(b["year"])
-
-                next_birthday = date(today.year, b_month, b_day)
-                if next_birthday < today:
-                    next_birthday = date(today.year + 1, b_month, b_day)
-
-                days_left = (next_birthday - today).days
-
-                # ✅ Только 3 и 7 дней
-                if days_left == 3:
-                    messages.append(
-                        f"⏳ Через 3 {days_word(3)} день рождения у {b['name']}!"
-                    )
-
-                elif days_left == 7:
-                    messages.append(
-                        f"📅 Через 7 {days_word(7)} день рождения у {b['name']}!"
-                    )
-
-            except:
-                continue
+        # ✅ Только 3 и 7 дней — две выборки из индекса
+        messages = birthday_notices(today)
 
         if messages:
-            self.birthday_toast = ToastNotification("\n".join(messages))
+            self.toasts.show_messages("birthday", messages, "\n")
 
         save_last_check({"date": today_str})
 
     def show_next_birthday(self):
-        birthdays = load_birthdays()
-        if not birthdays:
+        if not len(birthday_store):
             return
 
-        today = date.today()
-        messages = []
-
-        for b in birthdays:
-            try:
-                next_birthday = date(today.year, int(b["month"]), int(b["day"]))
-                if next_birthday < today:
-                    next_birthday = date(today.year + 1, int(b["month"]), int(b["day"]))
-
-                days_left = (next_birthday - today).days
-
-                # ✅ Только если 3 или 7 дней
-                if days_left in (3, 7):
-                    age = next_birthday.year - int(b["year"])
-                    messages.append(
-                        f"📅 {b['name']}\n"
-                        f"Через {days_left} {days_word(days_left)}\n"
-                        f"Исполнится {age} {years_word(age)}"
-                    )
-
-            except:
-                continue
+        # ✅ Только если 3 или 7 дней
+        messages = birthday_age_notices(date.today())
 
         if messages:
-            self.birthday_toast = ToastNotification("\n\n".join(messages))
+            self.toasts.show_messages("birthday", messages)
 
     # ===============================
-    # ПРОВЕРКА СОБЫТИЙ (НОВОЕ)
+    # НАПОМИНАНИЯ О СОБЫТИЯХ
     # ===============================
-    def check_events_once(self):
-        
-        today = date.today()   # ← ДОБАВИТЬ ЭТУ СТРОКУ
-
-        events = load_events()
-        messages = []
+    def show_event_reminders(self, events, today):
+        # Вызывается планировщиком, когда подошло время напомнить:
+        # [(дата повторения или None у разового, событие)]
+        messages = [
+            message for message in (event_notice(e, day, today) for day, e in events)
+            if message
+        ]
 
-        for e in events:
-            try:
-                event_date = date(
-                    int(e["year"]),
-                    int(e["month"]),
-                    int(e["day"])
-                )
+        if messages:
+            self.toasts.show_messages("event", messages)
 
-                days_left = (event_date - today).days
+    # ===============================
+    # ИМПОРТ И ЭКСПОРТ ИЗ TRAY
+    # ===============================
+    def import_file(self, store):
+        if self.importer is not None and self.importer.isRunning():
+            self.toasts.show_messages("event", ["📥 Импорт уже идёт"])
+            return
 
-                # 🔔 Напоминание за выбранное количество дней
-                remind_before = int(e.get("remind_before", 0))
+        path, _ = QFileDialog.getOpenFileName(
+            None, "Импорт", "", "CSV и iCalendar (*.csv *.ics);;Все файлы (*)"
+        )
+        if not path:
+            return
 
-                # если до события осталось ровно столько дней,
-                # сколько указано в колонке "Напомнить (дней)"
-                if days_left == remind_before:
+        # Разбор — в потоке; в хранилище пишем здесь, одним снимком
+        self.importer = ImportWorker(store, path)
+        self.importer.progress.connect(self.on_import_progress)
+        self.importer.imported.connect(self.on_imported)
+        QApplication.instance().aboutToQuit.connect(self.stop_import)
+        self.importer.start()
+
+    def stop_import(self):
+        # Выход посреди импорта: прерываем, в хранилище ничего не попадёт
+        if self.importer is not None:
+            self.importer.requestInterruption()
+            self.importer.wait()
+
+    def on_import_progress(self, rows):
+        self.tray.setToolTip(f"Импорт: {rows} строк…")
+
+    def on_imported(self, store, records, report):
+        self.tray.setToolTip("")
+        QApplication.instance().aboutToQuit.disconnect(self.stop_import)
+
+        if "error" in report:
+            print("Импорт не удался:", report["error"])
+            self.toasts.show_messages("event", [f"📥 Импорт не удался:\n{report['error']}"])
+            return
+        if records is None:
+            return
 
-                    hour = int(e.get("hour", 0))
-                    minute = int(e.get("minute", 0))
+        try:
+            added = store.put_many(records)
+        except OSError as e:
+            print("Импорт не удался:", e)
+            self.toasts.show_messages("event", [f"📥 Импорт не удался:\n{e}"])
+            return
 
-                    messages.append(
-                        f"🗓 {e['title']}\n"
-                        f"Через {days_left} {days_word(days_left)}\n"
-                        f"В {hour:02d}:{minute:02d}"
-                    )
+        message = (
+            f"📥 Импорт: строк {report['rows']}, добавлено {added}, "
+            f"дубликатов {report['duplicates']}, с ошибкой {report['invalid']}"
+        )
+        if report["invalid_rows"]:
+            message += "\nСтроки с ошибкой: " + ", ".join(map(str, report["invalid_rows"]))
+        self.toasts.show_messages("event", [message])
 
-            except:
-                continue
+    def export_file(self, store):
+        path, _ = QFileDialog.getSaveFileName(
+            None, "Экспорт", store.name + ".csv", "CSV (*.csv);;iCalendar (*.ics)"
+        )
+        if not path:
+            return
 
-        if messages:
-            self.event_toast = EventToastNotification(
-                "\n\n".join(messages)
-            )
+        try:
+            count = export_records(store.name, store.all(), path)
+        except OSError as e:
+            print("Экспорт не удался:", e)
+            self.toasts.show_messages("event", [f"📤 Экспорт не удался:\n{e}"])
+            return
+        self.toasts.show_messages("event", [f"📤 Экспортировано: {count}\n{path}"])
 
     # ===============================
     # ОТКРЫТИЕ ОКОН ИЗ TRAY
     # ===============================
     def open_birthday_window(self):
-        self.birthday_window = BirthdayWindow()
-        self.birthday_window.show()
+        # Окна создаются один раз и дальше только прячутся/показываются
+        if self.birthday_window is None:
+            self.birthday_window = BirthdayWindow()
+        else:
+            self.birthday_window.reopen()
 
     def open_events_window(self):
-        self.events_window = EventWindow()
-        self.events_window.show()       
+        if self.events_window is None:
+            self.events_window = EventWindow()
+        else:
+            self.events_window.reopen()
 
 
 # ===============================
@@ -0,0 +1,126 @@
+import sys
+import json
+from datetime import date
+
+
+# ===============================
+# КОМАНДНАЯ СТРОКА БЕЗ Qt
+# ===============================
+# Те же данные, что у питомца, но без окна и без Qt — для cron,
+# скриптов входа и быстрой проверки:
+#
+#   python reminder_cli.py due --days 7           — ближайшее, текстом
+#   python reminder_cli.py due --days 7 --json    — то же в JSON
+#   python reminder_cli.py import events team.ics
+#   python reminder_cli.py export birthdays birthdays.csv
+#
+# reminders импортируется только после разбора аргументов: --help
+# не трогает ни модуль, ни папку данных.
+KINDS = ("birthdays", "events")
+
+
+def stores(reminders):
+    return {"birthdays": reminders.birthday_store, "events": reminders.event_store}
+
+
+def due_line(item):
+    when = date.fromisoformat(item["date"]).strftime("%d.%m.%Y")
+    days = item["days_left"]
+
+    from reminders import days_word, years_word
+    left = "сегодня" if days == 0 else f"через {days} {days_word(days)}"
+
+    if item["kind"] == "birthday":
+        line = f"{when}        🎂 {item['name']} — {left}"
+        if "age" in item:
+            line += f", исполнится {item['age']} {years_word(item['age'])}"
+        return line
+    return f"{when} {item['time']}  🗓 {item['title']} — {left}"
+
+
+def run_due(args):
+    import reminders
+
+    items = reminders.due(date.today(), max(0, args.days))
+    if args.json:
+        print(json.dumps(items, ensure_ascii=False, indent=2))
+    else:
+        for item in items:
+            print(due_line(item))
+    return 0
+
+
+def run_import(args):
+    import csv
+    import reminders
+
+    store = stores(reminders)[args.kind]
+    known = reminders.store_fingerprints(store)
+
+    def progress(rows):
+        print(f"\r… {rows} строк", end="", file=sys.stderr, flush=True)
+
+    try:
+        records, report = reminders.import_records(args.kind, args.file, known, progress)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"\nИмпорт не удался: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+
+    try:
+        report["added"] = store.put_many(records)
+        reminders.writer.flush()
+    except OSError as e:
+        print(f"Импорт не удался: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, ensure_ascii=False) if args.json else (
+        f"Строк {report['rows']}, добавлено {report['added']}, "
+        f"дубликатов {report['duplicates']}, с ошибкой {report['invalid']}"
+    ))
+    return 0
+
+
+def run_export(args):
+    import reminders
+
+    store = stores(reminders)[args.kind]
+    try:
+        count = reminders.export_records(args.kind, store.all(), args.file)
+    except OSError as e:
+        print(f"Экспорт не удался: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps({"exported": count}) if args.json else f"Экспортировано: {count}")
+    return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="pet-reminder",
+        description="Напоминания Pet Reminder из командной строки"
+    )
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    due = commands.add_parser("due", help="дни рождения и события на ближайшие дни")
+    due.add_argument("--days", type=int, default=7)
+    due.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    due.set_defaults(run=run_due)
+
+    for name, run, help_text in (
+        ("import", run_import, "загрузить CSV или .ics"),
+        ("export", run_export, "выгрузить в CSV или .ics"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("kind", choices=KINDS)
+        command.add_argument("file")
+        command.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+        command.set_defaults(run=run)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
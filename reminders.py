@@ -0,0 +1,1568 @@
+import os
+import csv
+import re
+import json
+import time
+import uuid
+import bisect
+import calendar
+import itertools
+import heapq
+import atexit
+from datetime import date, datetime, timedelta, timezone
+
+
+# ===============================
+# НАПОМИНАНИЯ БЕЗ Qt
+# ===============================
+# Даты, хранилища, индексы, повторы, импорт/экспорт и тексты
+# напоминаний. Модуль не импортирует Qt и ничего не делает при
+# импорте: папка данных вычисляется и создаётся при первом
+# обращении. Его используют и питомец (pet.py), и командная
+# строка (reminder_cli.py).
+
+
+# ===============================
+# ПАПКА ДЛЯ ХРАНЕНИЯ ДАННЫХ (AppData)
+# ===============================
+_data_dir = None
+
+
+def data_dir():
+    global _data_dir
+    if _data_dir is None:
+        path = os.path.join(os.getenv("APPDATA") or os.path.expanduser("~"), "PetReminder")
+        os.makedirs(path, exist_ok=True)
+        _data_dir = path
+    return _data_dir
+
+
+def data_path(name):
+    return os.path.join(data_dir(), name)
+
+
+# ===============================
+# СКЛОНЕНИЯ
+# ===============================
+def years_word(n):
+    if 11 <= n % 100 <= 14:
+        return "лет"
+    if n % 10 == 1:
+        return "год"
+    if 2 <= n % 10 <= 4:
+        return "года"
+    return "лет"
+
+
+def days_word(n):
+    if 11 <= n % 100 <= 14:
+        return "дней"
+    if n % 10 == 1:
+        return "день"
+    if 2 <= n % 10 <= 4:
+        return "дня"
+    return "дней"
+
+
+# ===============================
+# ЗАПИСЬ НА ДИСК
+# ===============================
+# Все файлы данных пишутся через FileWriter:
+#   - сначала во временный файл, fsync, затем атомарный rename —
+#     падение посреди записи не оставит обрезанный JSON;
+#   - перед заменой текущий файл уходит в .bak1 (.bak1 → .bak2 ...);
+#   - серия сохранений в пределах SAVE_DEBOUNCE_MS сливается в одну
+#     запись (если задан таймер; без него пишем сразу).
+# Чтение при повреждённом файле берёт последний целый .bakN.
+BACKUP_COUNT = 3
+SAVE_DEBOUNCE_MS = 300
+
+
+def backup_path(path, n):
+    return f"{path}.bak{n}"
+
+
+def file_signature(path):
+    # (mtime, размер) — хватает, чтобы заметить чужую запись
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class FileWriter:
+    def __init__(self):
+        self.pending = {}
+        self.flush_armed = False
+        # fn(мс, колбэк) — откладывает flush; None — писать сразу
+        self.schedule_timer = None
+        # Повреждённые файлы не ротируем в бэкапы, а откладываем в сторону
+        self.corrupt = set()
+        self.stats = {}
+        # Подписи файлов после нашей последней записи или чтения
+        self.known = {}
+
+    # ---------- отложенная запись ----------
+    def replace(self, path, produce):
+        # produce() -> bytes вызывается только в момент записи
+        self.pending[path] = ("replace", produce)
+        self.kick()
+
+    def append(self, path, data):
+        entry = self.pending.get(path)
+        if entry and entry[0] == "append":
+            entry[1].append(data)
+        else:
+            self.pending[path] = ("append", [data])
+        self.kick()
+
+    def discard(self, path):
+        self.pending.pop(path, None)
+
+    def kick(self):
+        if self.schedule_timer is None:
+            self.flush()
+        elif not self.flush_armed:
+            self.flush_armed = True
+            self.schedule_timer(SAVE_DEBOUNCE_MS, self.flush)
+
+    def flush(self):
+        self.flush_armed = False
+        pending, self.pending = self.pending, {}
+        for path, (mode, payload) in pending.items():
+            if mode == "replace":
+                self.write_atomic(path, payload())
+            else:
+                self.write_append(path, b"".join(payload))
+
+    # ---------- сама запись ----------
+    def write_atomic(self, path, data, backups=BACKUP_COUNT):
+        started = time.perf_counter()
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.exists(path):
+            if path in self.corrupt:
+                os.replace(path, f"{path}.corrupt-{int(time.time())}")
+                self.corrupt.discard(path)
+            elif backups:
+                for n in range(backups - 1, 0, -1):
+                    if os.path.exists(backup_path(path, n)):
+                        os.replace(backup_path(path, n), backup_path(path, n + 1))
+                os.replace(path, backup_path(path, 1))
+
+        os.replace(tmp_path, path)
+        self.remember(path)
+        self.count(path, len(data), started)
+
+    def write_append(self, path, data):
+        started = time.perf_counter()
+        # Файл до нас уже дописал кто-то другой — подпись не обновляем,
+        # чтобы его правка перечиталась (вместе с нашей)
+        foreign = path in self.known and file_signature(path) != self.known[path]
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if not foreign:
+            self.remember(path)
+        self.count(path, len(data), started)
+
+    def remember(self, path):
+        self.known[path] = file_signature(path)
+
+    def changed_on_disk(self, path):
+        # Файл менял кто-то другой (синхронизация, второй экземпляр)
+        if path in self.pending:
+            return False
+        return file_signature(path) != self.known.get(path)
+
+    def count(self, path, size, started):
+        ms = (time.perf_counter() - started) * 1000
+        stat = self.stats.setdefault(
+            os.path.basename(path),
+            {"writes": 0, "bytes": 0, "ms_total": 0.0, "ms_last": 0.0}
+        )
+        stat["writes"] += 1
+        stat["bytes"] += size
+        stat["ms_total"] += ms
+        stat["ms_last"] = ms
+
+    # ---------- чтение с откатом на бэкап ----------
+    def read_json(self, path, default):
+        data, corrupt, notes = self.load_json(path, default)
+        self.settle(path, corrupt, notes)
+        return data
+
+    @staticmethod
+    def load_json(path, default):
+        # Без побочных эффектов — можно из потока:
+        # (данные, основной файл испорчен, сообщения для вывода)
+        corrupt = False
+        notes = []
+        for n in range(BACKUP_COUNT + 1):
+            candidate = backup_path(path, n) if n else path
+            try:
+                with open(candidate, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                notes.append(f"Ошибка чтения {candidate} {e}")
+                if not n:
+                    corrupt = True
+                continue
+
+            if n:
+                notes.append(f"Восстановлено из резервной копии: {candidate}")
+            return data, corrupt, notes
+
+        return default, corrupt, notes
+
+    def settle(self, path, corrupt, notes):
+        # Итог load_json — в основном потоке
+        for note in notes:
+            print(note)
+        if corrupt:
+            self.corrupt.add(path)
+
+
+writer = FileWriter()
+atexit.register(writer.flush)
+
+
+def json_bytes(data, **kwargs):
+    return json.dumps(data, ensure_ascii=False, **kwargs).encode("utf-8")
+
+
+# ===============================
+# ФАЙЛЫ
+# ===============================
+def load_last_check():
+    return writer.read_json(data_path("birthday_notified.json"), {})
+
+
+def save_last_check(data):
+    writer.replace(data_path("birthday_notified.json"), lambda: json_bytes(data))
+
+
+# ===============================
+# СОБЫТИЯ (ОТДЕЛЬНО ОТ ДР)
+# ===============================
+
+def load_events_last_check():
+    return writer.read_json(data_path("events_notified.json"), {})
+
+def save_events_last_check(data):
+    writer.replace(data_path("events_notified.json"), lambda: json_bytes(data))
+
+
+# ===============================
+# ХРАНИЛИЩЕ НАПОМИНАНИЙ
+# ===============================
+# Записи читаются с диска один раз и дальше живут в памяти.
+# На диске: снимок <name>.json (тот же список, что и раньше, но у
+# каждой записи есть "id") + журнал <name>.journal — по строке JSON
+# на каждое изменение. Сохранение дописывает в журнал только
+# изменённые записи; когда журнал разрастается, он сворачивается
+# в новый снимок.
+JOURNAL_COMPACT_MIN = 200
+
+
+# ===============================
+# ПАКЕТНЫЙ РАСЧЁТ (NumPy, если установлен)
+# ===============================
+# Полные проходы по всем записям (перестройка индексов и расписания)
+# на больших списках считаются столбцами NumPy за один векторный
+# проход. NumPy необязателен и импортируется только когда записей
+# много; без него работает обычный цикл.
+VECTORIZE_MIN = 1000
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_numpy = None
+
+
+def numpy_module():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def use_numpy(count):
+    return count >= VECTORIZE_MIN and numpy_module() is not None
+
+
+def to_int(value):
+    # Число вне int64 — тоже ошибка: в столбец NumPy оно не влезет
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if INT64_MIN <= value <= INT64_MAX else None
+
+
+class ReminderColumns:
+    # Поля записей столбцами; valid — строка без ошибок разбора
+    def __init__(self, records, fields):
+        np = numpy_module()
+        self.ids = [r.get("id") for r in records]
+        self.valid = np.ones(len(records), dtype=bool)
+
+        for field, default in fields:
+            values = [r.get(field, default) for r in records]
+            try:
+                column = np.fromiter(values, dtype=np.int64, count=len(values))
+            except (TypeError, ValueError, OverflowError):
+                parsed = [to_int(v) for v in values]
+                self.valid &= np.array([v is not None for v in parsed])
+                column = np.array([v or 0 for v in parsed], dtype=np.int64)
+            setattr(self, field, column)
+
+    def dates(self, years=None):
+        # datetime64[D] из (год, месяц, день) + маска допустимых дат
+        np = numpy_module()
+        years = self.year if years is None else years
+        ok = (
+            self.valid &
+            (self.month >= 1) & (self.month <= 12) &
+            (self.day >= 1) & (self.day <= 31) &
+            (years >= 1) & (years <= 9999)
+        )
+        months = np.where(ok, (years - 1970) * 12 + self.month - 1, 0)
+        first = months.astype("datetime64[M]")
+        dates = first.astype("datetime64[D]") + np.where(ok, self.day - 1, 0)
+        # 31.04 превратится в 01.05 — такие отсекаем
+        ok &= dates.astype("datetime64[M]") == first
+        return dates, ok
+
+
+def vector_annual_keys(records):
+    np = numpy_module()
+    cols = ReminderColumns(records, (("month", None), ("day", None)))
+    # Проверяем по високосному 2000 году, чтобы 29.02 был допустим
+    _, ok = cols.dates(np.full(len(records), 2000))
+
+    ids = np.array(cols.ids)
+    order = np.lexsort((ids[ok], cols.day[ok], cols.month[ok]))
+    keys = list(zip(
+        cols.month[ok][order].tolist(),
+        cols.day[ok][order].tolist(),
+        ids[ok][order].tolist()
+    ))
+    return keys, set(ids[~ok].tolist())
+
+
+def vector_date_keys(records):
+    np = numpy_module()
+    cols = ReminderColumns(records, (("year", None), ("month", None), ("day", None)))
+    dates, ok = cols.dates()
+
+    ids = np.array(cols.ids)
+    ordinals = dates[ok].astype(np.int64) + EPOCH_ORDINAL
+    order = np.lexsort((ids[ok], ordinals))
+    keys = list(zip(ordinals[order].tolist(), ids[ok][order].tolist()))
+    return keys, set(ids[~ok].tolist())
+
+
+def vector_fire_times(records, now):
+    # Для расписания: (будущие [(время, id)], сегодняшние прошедшие [id])
+    np = numpy_module()
+    cols = ReminderColumns(records, (
+        ("year", None), ("month", None), ("day", None),
+        ("hour", 0), ("minute", 0), ("remind_before", 0)
+    ))
+    dates, ok = cols.dates()
+    ok &= (cols.hour >= 0) & (cols.hour <= 23) & (cols.minute >= 0) & (cols.minute <= 59)
+    # Как в event_fire_time: сдвиг не больше timedelta, итог — в годах 1..9999
+    ok &= np.abs(cols.remind_before) <= timedelta.max.days
+    before = np.where(ok, cols.remind_before, 0)
+
+    fire = (
+        dates.astype("datetime64[m]") +
+        (cols.hour * 60 + cols.minute - before * 1440).astype("timedelta64[m]")
+    )
+    ok &= (fire >= np.datetime64("0001-01-01")) & (fire < np.datetime64("10000-01-01"))
+    now64 = np.datetime64(now.replace(microsecond=0), "s")
+    today64 = np.datetime64(now.date(), "D")
+
+    future = ok & (fire > now64)
+    due = ok & ~future & (fire.astype("datetime64[D]") == today64)
+
+    ids = np.array(cols.ids)
+    upcoming = list(zip(fire[future].astype("datetime64[s]").tolist(), ids[future].tolist()))
+    return upcoming, ids[due].tolist()
+
+
+# ===============================
+# ПОВТОРЯЮЩИЕСЯ СОБЫТИЯ
+# ===============================
+# Повтор хранится в самом событии одним правилом:
+#   "repeat": {"freq": "weekly", "interval": 2, "until": "2027-06-01",
+#              "count": 10, "except": ["2026-12-31"]}
+# Дата события — первое повторение. Повторения не пишутся в файл и
+# не раскладываются заранее: k-е повторение считается арифметикой,
+# генератор отдаёт только попавшие в запрошенное окно.
+# 31-е число в коротком месяце и 29.02 в невисокосный год сдвигаются
+# на последний день месяца. Пропущенные (except) даты входят в count.
+REPEAT_STEPS = {
+    "daily": ("days", 1),
+    "weekly": ("days", 7),
+    "monthly": ("months", 1),
+    "yearly": ("months", 12),
+}
+
+REPEAT_LABELS = {
+    "": "—",
+    "daily": "каждый день",
+    "weekly": "каждую неделю",
+    "monthly": "каждый месяц",
+    "yearly": "каждый год",
+}
+REPEAT_UNITS = {"daily": "дн.", "weekly": "нед.", "monthly": "мес.", "yearly": "г."}
+
+
+class RepeatRule:
+    def __init__(self, start, freq, interval=1, until=None, count=None, exceptions=()):
+        self.start = start
+        self.unit, step = REPEAT_STEPS[freq]
+        self.step = step * interval
+        self.until = until
+        self.count = count
+        self.exceptions = frozenset(exceptions)
+
+    def nth(self, k):
+        # k-е повторение (с нуля) или None, если вышло за календарь
+        try:
+            if self.unit == "days":
+                return self.start + timedelta(days=k * self.step)
+
+            months = self.start.month - 1 + k * self.step
+            year = self.start.year + months // 12
+            month = months % 12 + 1
+            return date(year, month, min(self.start.day, calendar.monthrange(year, month)[1]))
+        except (OverflowError, ValueError):
+            return None
+
+    def first_index(self, first):
+        # Номер повторения не позже первого попадающего в окно
+        if first <= self.start:
+            return 0
+        if self.unit == "days":
+            return -(-(first - self.start).days // self.step)
+        months = (first.year - self.start.year) * 12 + first.month - self.start.month
+        return months // self.step
+
+    def between(self, first, last=None):
+        # Повторения в [first, last] по порядку; last=None — без конца
+        k = self.first_index(first)
+        while self.count is None or k < self.count:
+            day = self.nth(k)
+            if day is None or (self.until and day > self.until) or (last and day > last):
+                return
+            if day >= first and day not in self.exceptions:
+                yield day
+            k += 1
+
+    def next(self, first):
+        return next(self.between(first), None)
+
+
+def repeat_rule(record):
+    # Правило повтора или None: разовое событие или ошибка в правиле
+    repeat = record.get("repeat")
+    if not repeat:
+        return None
+    try:
+        start = date(int(record["year"]), int(record["month"]), int(record["day"]))
+        interval = int(repeat.get("interval", 1))
+        if interval < 1:
+            return None
+        return RepeatRule(
+            start,
+            repeat["freq"],
+            interval,
+            date.fromisoformat(repeat["until"]) if repeat.get("until") else None,
+            int(repeat["count"]) if repeat.get("count") else None,
+            (date.fromisoformat(d) for d in repeat.get("except", ()))
+        )
+    except (KeyError, TypeError, ValueError, AttributeError, OverflowError):
+        return None
+
+
+def repeat_text(repeat):
+    # Подпись правила для таблицы событий
+    if not isinstance(repeat, dict) or not repeat.get("freq"):
+        return REPEAT_LABELS[""]
+
+    freq = repeat["freq"]
+    text = REPEAT_LABELS.get(freq, str(freq))
+    interval = to_int(repeat.get("interval")) or 1
+    if interval > 1 and freq in REPEAT_UNITS:
+        text = f"каждые {interval} {REPEAT_UNITS[freq]}"
+
+    until = repeat.get("until")
+    if until:
+        try:
+            text += f" до {date.fromisoformat(until):%d.%m.%Y}"
+        except (TypeError, ValueError):
+            pass
+    count = to_int(repeat.get("count"))
+    if count:
+        text += f", {count} раз"
+    if repeat.get("except"):
+        text += f", пропусков: {len(repeat['except'])}"
+    return text
+
+
+# ===============================
+# ИНДЕКСЫ БЛИЖАЙШИХ ДАТ
+# ===============================
+# Индекс держит отсортированный список ключей и отвечает на
+# «что будет ровно через N дней», «ближайшие K» и «всё в окне
+# [a, b] дней» за O(log n + ответ). При изменении записи ключ
+# переставляется точечно, без пересортировки всего списка.
+class SortedKeyIndex:
+    # Общая часть: ключ записи + id в отсортированном списке
+    def __init__(self):
+        self.keys = []
+        self.undated = set()
+
+    def rebuild(self, records):
+        records = list(records)
+        if use_numpy(len(records)):
+            self.keys, self.undated = self.vector_keys(records)
+            return
+
+        self.keys = []
+        self.undated = set()
+        for record in records:
+            key = self.key(record)
+            if key is None:
+                self.undated.add(record["id"])
+            else:
+                self.keys.append(key + (record["id"],))
+        self.keys.sort()
+
+    def add(self, record):
+        key = self.key(record)
+        if key is None:
+            self.undated.add(record["id"])
+        else:
+            bisect.insort(self.keys, key + (record["id"],))
+
+    def remove(self, record):
+        key = self.key(record)
+        if key is None:
+            self.undated.discard(record["id"])
+            return
+        entry = key + (record["id"],)
+        i = bisect.bisect_left(self.keys, entry)
+        if i < len(self.keys) and self.keys[i] == entry:
+            del self.keys[i]
+
+
+class AnnualIndex(SortedKeyIndex):
+    # Ежегодные даты (ДР): ключ — (месяц, день), год не важен
+    vector_keys = staticmethod(vector_annual_keys)
+
+    @staticmethod
+    def key(record):
+        try:
+            month, day = int(record["month"]), int(record["day"])
+            # Проверяем по високосному году, чтобы 29.02 был допустим
+            date(2000, month, day)
+        except (KeyError, TypeError, ValueError):
+            return None
+        return (month, day)
+
+    @staticmethod
+    def occurrence(year, month, day):
+        # 29 февраля в невисокосный год отмечаем 28-го
+        if month == 2 and day == 29 and not calendar.isleap(year):
+            return date(year, 2, 28)
+        return date(year, month, day)
+
+    def sort_key(self, record, today):
+        # Тот же порядок, что у ordered(): по ближайшему празднику
+        key = self.key(record)
+        if key is None:
+            return (1, 0, 0, 0, record.get("id") or "")
+        month, day = key
+        occurrence = self.occurrence(today.year, month, day)
+        if occurrence < today:
+            occurrence = self.occurrence(today.year + 1, month, day)
+        return (0, occurrence.toordinal(), month, day, record.get("id") or "")
+
+    def window(self, today, first, last):
+        # (дата, id) для всех, у кого праздник через first..last дней
+        start = today + timedelta(days=first)
+        end = today + timedelta(days=last)
+        result = []
+
+        while start <= end:
+            year = start.year
+            stop = min(end, date(year, 12, 31))
+            hi = (stop.month, stop.day)
+            # 28.02 невисокосного года захватывает и 29.02
+            if hi == (2, 28) and not calendar.isleap(year):
+                hi = (2, 29)
+
+            lo_i = bisect.bisect_left(self.keys, (start.month, start.day))
+            hi_i = bisect.bisect_left(self.keys, (hi[0], hi[1] + 1))
+            for month, day, record_id in self.keys[lo_i:hi_i]:
+                result.append((self.occurrence(year, month, day), record_id))
+
+            start = date(year + 1, 1, 1)
+
+        return result
+
+    def upcoming(self, today):
+        # (дата, id) по кругу начиная с сегодняшнего дня
+        pos = bisect.bisect_left(self.keys, (today.month, today.day))
+        for month, day, record_id in self.keys[pos:]:
+            yield self.occurrence(today.year, month, day), record_id
+        for month, day, record_id in self.keys[:pos]:
+            yield self.occurrence(today.year + 1, month, day), record_id
+
+    def ordered(self, today):
+        return [record_id for _, record_id in self.upcoming(today)] + list(self.undated)
+
+
+class DateIndex(SortedKeyIndex):
+    # Разовые даты (события): ключ — порядковый номер дня.
+    # Повторяющиеся лежат отдельно правилами (id -> RepeatRule) и
+    # разворачиваются только на запрошенное окно.
+    vector_keys = staticmethod(vector_date_keys)
+
+    def __init__(self):
+        super().__init__()
+        self.rules = {}
+
+    def rebuild(self, records):
+        single = []
+        self.rules = {}
+        for record in records:
+            rule = repeat_rule(record)
+            if rule is None:
+                single.append(record)
+            else:
+                self.rules[record["id"]] = rule
+        super().rebuild(single)
+
+    def add(self, record):
+        rule = repeat_rule(record)
+        if rule is None:
+            super().add(record)
+        else:
+            self.rules[record["id"]] = rule
+
+    def remove(self, record):
+        if self.rules.pop(record["id"], None) is None:
+            super().remove(record)
+
+    @staticmethod
+    def key(record):
+        try:
+            event_date = date(int(record["year"]), int(record["month"]), int(record["day"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+        return (event_date.toordinal(),)
+
+    @staticmethod
+    def rule_key(rule, today):
+        # Серия — по ближайшему повторению; закончившаяся — по началу
+        upcoming = rule.next(today)
+        if upcoming is None:
+            return 1, rule.start.toordinal()
+        return 0, upcoming.toordinal()
+
+    def sort_key(self, record, today):
+        # Будущие, затем прошедшие, затем с ошибочной датой
+        rule = repeat_rule(record)
+        if rule is not None:
+            return self.rule_key(rule, today) + (record.get("id") or "",)
+
+        key = self.key(record)
+        if key is None:
+            return (2, 0, record.get("id") or "")
+        past = 1 if key[0] < today.toordinal() else 0
+        return (past, key[0], record.get("id") or "")
+
+    def window(self, today, first, last):
+        base = today.toordinal()
+        lo_i = bisect.bisect_left(self.keys, (base + first,))
+        hi_i = bisect.bisect_left(self.keys, (base + last + 1,))
+        result = [
+            (date.fromordinal(ordinal), record_id)
+            for ordinal, record_id in self.keys[lo_i:hi_i]
+        ]
+
+        if self.rules:
+            start = today + timedelta(days=first)
+            end = today + timedelta(days=last)
+            for record_id, rule in self.rules.items():
+                result.extend((day, record_id) for day in rule.between(start, end))
+            result.sort()
+        return result
+
+    @staticmethod
+    def series(record_id, rule, today):
+        for day in rule.between(today):
+            yield day, record_id
+
+    def upcoming(self, today):
+        # Разовые и все серии одним потоком по дате — лениво
+        pos = bisect.bisect_left(self.keys, (today.toordinal(),))
+        single = (
+            (date.fromordinal(ordinal), record_id)
+            for ordinal, record_id in self.keys[pos:]
+        )
+        yield from heapq.merge(single, *(
+            self.series(record_id, rule, today)
+            for record_id, rule in self.rules.items()
+        ))
+
+    def ordered(self, today):
+        # Сначала будущие, потом прошедшие, потом без даты
+        pos = bisect.bisect_left(self.keys, (today.toordinal(),))
+        future = self.keys[pos:]
+        past = self.keys[:pos]
+
+        if self.rules:
+            series = ([], [])
+            for record_id, rule in self.rules.items():
+                ended, ordinal = self.rule_key(rule, today)
+                series[ended].append((ordinal, record_id))
+            future = list(heapq.merge(future, sorted(series[0])))
+            past = list(heapq.merge(past, sorted(series[1])))
+
+        return (
+            [record_id for _, record_id in future] +
+            [record_id for _, record_id in past] +
+            list(self.undated)
+        )
+
+
+class ReminderStore:
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+        self.records = None
+        self.journal_ops = 0
+        # Растёт при каждом своём изменении: фоновая перезагрузка,
+        # начатая до него, устарела
+        self.generation = 0
+        self.listeners = []
+        self.reload_listeners = []
+
+    # Пути — при обращении: папка данных не нужна до первого чтения
+    @property
+    def snapshot_path(self):
+        return data_path(self.name + ".json")
+
+    @property
+    def journal_path(self):
+        return data_path(self.name + ".journal")
+
+    # ---------- загрузка ----------
+    def ensure_loaded(self):
+        if self.records is None:
+            self.load()
+
+    def load(self):
+        signatures = self.disk_signatures()
+        self.install(self.read_disk(), signatures)
+
+    def disk_paths(self):
+        return (self.snapshot_path, self.journal_path)
+
+    def disk_signatures(self):
+        return [file_signature(path) for path in self.disk_paths()]
+
+    def changed_on_disk(self):
+        return any(writer.changed_on_disk(path) for path in self.disk_paths())
+
+    def read_disk(self):
+        # Только читает файлы и строит новый индекс — можно из потока
+        records = {}
+        migrated = False
+
+        # Испорченный снимок отмечается в writer уже в install()
+        snapshot, corrupt, notes = writer.load_json(self.snapshot_path, [])
+
+        # Правленный руками или чужой файл: не список — как пустой,
+        # не записи и id, которые нельзя сделать ключом, — пропускаем
+        if not isinstance(snapshot, list):
+            snapshot = []
+
+        for record in snapshot:
+            if not isinstance(record, dict):
+                continue
+            # Разовая миграция старых файлов без id
+            if not record.get("id"):
+                record["id"] = uuid.uuid4().hex
+                migrated = True
+            try:
+                records[record["id"]] = record
+            except TypeError:
+                continue
+
+        ops = self.replay_journal(records)
+        index = type(self.index)()
+        index.rebuild(records.values())
+        return records, ops, index, migrated, (corrupt, notes)
+
+    def install(self, loaded, signatures):
+        self.records, self.journal_ops, self.index, migrated, (corrupt, notes) = loaded
+        writer.settle(self.snapshot_path, corrupt, notes)
+        for path, signature in zip(self.disk_paths(), signatures):
+            writer.known[path] = signature
+
+        if migrated:
+            self.compact()
+
+    def reload(self, loaded, signatures):
+        # Результат фоновой перезагрузки после чужой правки файлов
+        self.install(loaded, signatures)
+        self.notify()
+        self.notify_reload()
+
+    def replay_journal(self, records):
+        ops = 0
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # Оборванная последняя строка после падения
+                        break
+
+                    # Целый JSON, но не операция (правка руками,
+                    # синхронизация) — пропускаем строку
+                    try:
+                        if op["op"] == "put":
+                            record = op["record"]
+                            records[record["id"]] = record
+                        elif op["op"] == "delete":
+                            records.pop(op["id"], None)
+                    except (KeyError, TypeError):
+                        continue
+                    ops += 1
+        except FileNotFoundError:
+            pass
+        return ops
+
+    # ---------- чтение ----------
+    def all(self):
+        self.ensure_loaded()
+        return list(self.records.values())
+
+    def get(self, record_id):
+        self.ensure_loaded()
+        return self.records.get(record_id)
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.records)
+
+    def ordered(self, today):
+        # Все записи: по ближайшей дате, прошедшие и ошибочные — в конце
+        self.ensure_loaded()
+        return [self.records[i] for i in self.index.ordered(today)]
+
+    def window(self, today, first, last):
+        # (дата, запись) с датой через first..last дней от today
+        self.ensure_loaded()
+        return [(d, self.records[i]) for d, i in self.index.window(today, first, last)]
+
+    def on_day(self, today, days):
+        return self.window(today, days, days)
+
+    def next_k(self, today, k):
+        self.ensure_loaded()
+        return [
+            (d, self.records[i])
+            for d, i in itertools.islice(self.index.upcoming(today), k)
+        ]
+
+    # ---------- изменения ----------
+    def apply(self, puts=(), deletes=()):
+        self.ensure_loaded()
+        ops = []
+
+        for record in puts:
+            record = dict(record)
+            if not record.get("id"):
+                record["id"] = uuid.uuid4().hex
+
+            old = self.records.get(record["id"])
+            if old is not None:
+                self.index.remove(old)
+            self.records[record["id"]] = record
+            self.index.add(record)
+            ops.append({"op": "put", "record": record})
+
+        for record_id in deletes:
+            old = self.records.pop(record_id, None)
+            if old is not None:
+                self.index.remove(old)
+                ops.append({"op": "delete", "id": record_id})
+
+        if not ops:
+            return 0
+
+        self.generation += 1
+        self.append_journal(ops)
+        self.notify()
+        return len(ops)
+
+    def put_many(self, records):
+        # Массовое добавление (импорт): индекс строится заново один раз,
+        # а на диск всё уходит одной атомарной записью снимка —
+        # целиком или никак, без тысяч строк журнала. Память меняется
+        # только после записи: при OSError хранилище остаётся прежним
+        self.ensure_loaded()
+        if not records:
+            return 0
+
+        merged = dict(self.records)
+        for record in records:
+            if not record.get("id"):
+                record["id"] = uuid.uuid4().hex
+            merged[record["id"]] = record
+
+        index = type(self.index)()
+        index.rebuild(merged.values())
+        self.compact(merged)
+
+        self.records = merged
+        self.index = index
+        self.generation += 1
+        # Для редакторов это как чужая правка: таблицу надо перечитать
+        self.notify()
+        self.notify_reload()
+        return len(records)
+
+    def append_journal(self, ops):
+        writer.append(
+            self.journal_path,
+            b"".join(json_bytes(op) + b"\n" for op in ops)
+        )
+
+        self.journal_ops += len(ops)
+        if self.journal_ops > max(JOURNAL_COMPACT_MIN, len(self.records)):
+            self.compact()
+
+    def compact(self, records=None):
+        # Снимок уже содержит всё из журнала: отложенные дописывания
+        # не нужны — но отбрасываем их только после записи снимка.
+        # Повторное применение журнала безопасно, поэтому падение
+        # между двумя записями ничего не теряет.
+        if records is None:
+            records = self.records
+        writer.write_atomic(
+            self.snapshot_path,
+            json_bytes(list(records.values()), indent=4)
+        )
+        writer.discard(self.journal_path)
+        writer.write_atomic(self.journal_path, b"", backups=0)
+        self.journal_ops = 0
+
+    # ---------- подписки ----------
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def subscribe_reload(self, callback):
+        # Перезагрузка с диска и импорт — без правок из самого редактора
+        self.reload_listeners.append(callback)
+
+    def unsubscribe_reload(self, callback):
+        if callback in self.reload_listeners:
+            self.reload_listeners.remove(callback)
+
+    def notify(self):
+        for callback in list(self.listeners):
+            callback()
+
+    def notify_reload(self):
+        for callback in list(self.reload_listeners):
+            callback()
+
+
+birthday_store = ReminderStore("birthdays", AnnualIndex())
+event_store = ReminderStore("events", DateIndex())
+
+
+# ===============================
+# ВРЕМЯ НАПОМИНАНИЙ
+# ===============================
+def event_fire_time(e):
+    # Дата и время события минус «напомнить за N дней»
+    try:
+        when = datetime(
+            int(e["year"]), int(e["month"]), int(e["day"]),
+            int(e.get("hour", 0)), int(e.get("minute", 0))
+        )
+        return when - timedelta(days=int(e.get("remind_before", 0)))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+
+
+def repeat_fire_times(e, rule, since):
+    # (время напоминания, дата повторения) для повторений, о которых
+    # напоминают в день since или позже — по одному, лениво
+    try:
+        offset = (
+            datetime(2000, 1, 1, int(e.get("hour", 0)), int(e.get("minute", 0))) -
+            datetime(2000, 1, 1) -
+            timedelta(days=int(e.get("remind_before", 0)))
+        )
+    except (TypeError, ValueError, OverflowError):
+        return
+
+    midnight = datetime.combine(since, datetime.min.time())
+    for day in rule.between((midnight - offset).date()):
+        when = datetime.combine(day, datetime.min.time()) + offset
+        if when >= midnight:
+            yield when, day
+
+
+def next_midnight(now):
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+# ===============================
+# ЧТО ПОРА НАПОМНИТЬ
+# ===============================
+# Тексты уведомлений питомца и список ближайшего для командной строки.
+BIRTHDAY_NOTICE_DAYS = ((3, "⏳"), (7, "📅"))
+
+
+def birthday_notices(today):
+    # Раз в день: у кого день рождения ровно через 3 и 7 дней
+    messages = []
+    for days_left, icon in BIRTHDAY_NOTICE_DAYS:
+        for _, b in birthday_store.on_day(today, days_left):
+            messages.append(
+                f"{icon} Через {days_left} {days_word(days_left)} день рождения у {b['name']}!"
+            )
+    return messages
+
+
+def birthday_age_notices(today):
+    # То же, но с возрастом — для «Показать ближайший ДР»
+    messages = []
+    for days_left, _ in BIRTHDAY_NOTICE_DAYS:
+        for next_birthday, b in birthday_store.on_day(today, days_left):
+            try:
+                age = next_birthday.year - int(b["year"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            messages.append(
+                f"📅 {b['name']}\n"
+                f"Через {days_left} {days_word(days_left)}\n"
+                f"Исполнится {age} {years_word(age)}"
+            )
+    return messages
+
+
+def event_notice(e, event_date, today):
+    # event_date — дата повторения или None у разового события
+    try:
+        event_date = event_date or date(int(e["year"]), int(e["month"]), int(e["day"]))
+        days_left = (event_date - today).days
+        hour = int(e.get("hour", 0))
+        minute = int(e.get("minute", 0))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return (
+        f"🗓 {e['title']}\n"
+        f"Через {days_left} {days_word(days_left)}\n"
+        f"В {hour:02d}:{minute:02d}"
+    )
+
+
+def due(today, days):
+    # Дни рождения и события (с повторениями) на ближайшие days дней,
+    # по дате и времени
+    result = []
+
+    for when, b in birthday_store.window(today, 0, days):
+        item = {
+            "kind": "birthday",
+            "date": when.isoformat(),
+            "days_left": (when - today).days,
+            "name": b.get("name", ""),
+        }
+        year = to_int(b.get("year"))
+        if year:
+            item["age"] = when.year - year
+        result.append(item)
+
+    for when, e in event_store.window(today, 0, days):
+        result.append({
+            "kind": "event",
+            "date": when.isoformat(),
+            "days_left": (when - today).days,
+            "time": "%02d:%02d" % (to_int(e.get("hour")) or 0, to_int(e.get("minute")) or 0),
+            "title": e.get("title", ""),
+            "repeat": bool(e.get("repeat")),
+        })
+
+    result.sort(key=lambda item: (item["date"], item.get("time", "")))
+    return result
+
+
+# ===============================
+# ИМПОРТ И ЭКСПОРТ (CSV, iCalendar)
+# ===============================
+# Файл читается построчно, целиком в память не грузится: строка →
+# запись → пачка по IMPORT_BATCH. Даты пачки проверяются разом
+# (NumPy, если записей много), дубликаты отсекаются по множеству
+# отпечатков уже сохранённых и уже принятых записей. В хранилище
+# результат попадает одним put_many — один атомарный снимок.
+# Формат выбирается по расширению: .ics — iCalendar, иначе CSV.
+IMPORT_BATCH = 5000
+IMPORT_REPORT_ERRORS = 5
+# «Напомнить за N дней» больше пяти лет — явная ошибка в файле
+REMIND_BEFORE_MAX = 5 * 366
+
+CSV_FIELDS = {
+    "birthdays": ["name", "date"],
+    "events": ["title", "date", "time", "remind_before", "repeat", "interval", "until", "count", "except"],
+}
+# Заголовки столбцов, которые понимает импорт (регистр не важен)
+CSV_ALIASES = {
+    "имя": "name",
+    "название": "title",
+    "summary": "title",
+    "дата": "date",
+    "время": "time",
+    "повтор": "repeat",
+    "напомнить (дней)": "remind_before",
+    "день": "day",
+    "месяц": "month",
+    "год": "year",
+}
+
+
+def parse_date(text):
+    # (год, месяц, день) из 2026-01-05, 05.01.2026 или 20260105;
+    # сама дата проверяется потом, пачкой
+    text = (text or "").strip()
+    match = (
+        re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text) or
+        re.fullmatch(r"(\d{4})(\d{2})(\d{2})", text)
+    )
+    if match:
+        return tuple(int(v) for v in match.groups())
+    match = re.fullmatch(r"(\d{1,2})\.(\d{1,2})\.(\d{4})", text)
+    if match:
+        day, month, year = (int(v) for v in match.groups())
+        return year, month, day
+    return None
+
+
+def row_date(row):
+    if row.get("date"):
+        return parse_date(row["date"])
+    ymd = (to_int(row.get("year")), to_int(row.get("month")), to_int(row.get("day")))
+    return None if None in ymd else ymd
+
+
+def birthday_from_row(row):
+    name = (row.get("name") or "").strip()
+    ymd = row_date(row)
+    if not name or ymd is None:
+        return None
+    year, month, day = ymd
+    return {"name": name, "day": day, "month": month, "year": year}
+
+
+def event_from_row(row):
+    title = (row.get("title") or "").strip()
+    ymd = row_date(row)
+    if not title or ymd is None:
+        return None
+
+    hour, minute = to_int(row.get("hour")) or 0, to_int(row.get("minute")) or 0
+    if row.get("time"):
+        match = re.fullmatch(r"(\d{1,2}):(\d{2})(?::\d{2})?", row["time"].strip())
+        if not match:
+            return None
+        hour, minute = int(match.group(1)), int(match.group(2))
+    remind_before = to_int(row.get("remind_before") or 0)
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    if remind_before is None or not 0 <= remind_before <= REMIND_BEFORE_MAX:
+        return None
+
+    year, month, day = ymd
+    record = {
+        "title": title,
+        "day": day,
+        "month": month,
+        "year": year,
+        "hour": hour,
+        "minute": minute,
+        "remind_before": remind_before
+    }
+
+    freq = (row.get("repeat") or "").strip().lower()
+    if freq:
+        repeat = {"freq": freq}
+        for field in ("interval", "count"):
+            if row.get(field):
+                repeat[field] = to_int(row[field])
+        if row.get("until"):
+            until = parse_date(row["until"])
+            repeat["until"] = "%04d-%02d-%02d" % until if until else row["until"]
+        if row.get("except"):
+            repeat["except"] = [
+                "%04d-%02d-%02d" % ymd if ymd else text
+                for text in row["except"].split()
+                for ymd in (parse_date(text),)
+            ]
+        record["repeat"] = repeat
+    return record
+
+
+def birthday_fingerprint(record):
+    return (
+        str(record.get("name", "")).strip().casefold(),
+        to_int(record.get("day")), to_int(record.get("month")), to_int(record.get("year"))
+    )
+
+
+def event_fingerprint(record):
+    return (
+        str(record.get("title", "")).strip().casefold(),
+        to_int(record.get("year")), to_int(record.get("month")), to_int(record.get("day")),
+        to_int(record.get("hour", 0)), to_int(record.get("minute", 0))
+    )
+
+
+IMPORT_KINDS = {
+    "birthdays": (birthday_from_row, birthday_fingerprint),
+    "events": (event_from_row, event_fingerprint),
+}
+
+
+def store_fingerprints(store):
+    fingerprint = IMPORT_KINDS[store.name][1]
+    return {fingerprint(r) for r in store.all()}
+
+
+# ---------- чтение файлов ----------
+def read_csv_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        # Разделитель — по началу файла (Excel в русской локали пишет «;»)
+        try:
+            delimiter = csv.Sniffer().sniff(f.read(4096), delimiters=",;\t").delimiter
+        except csv.Error:
+            delimiter = ","
+        f.seek(0)
+
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [CSV_ALIASES.get(h.strip().lower(), h.strip().lower()) for h in header]
+        for values in reader:
+            if any(values):
+                yield dict(zip(fields, values))
+
+
+def unfold_ics(lines):
+    # Длинные строки iCalendar продолжаются строками с пробела
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def ics_unescape(value):
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def ics_datetime(value):
+    # DATE или DATE-TIME; время в UTC (…Z) переводим в местное
+    value = value.strip()
+    try:
+        if "T" not in value:
+            return datetime.strptime(value[:8], "%Y%m%d")
+        when = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+    if value.endswith("Z"):
+        when = when.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return when
+
+
+def ics_row(event):
+    # VEVENT → строка в тех же полях, что и у CSV
+    summary = ics_unescape(event.get("SUMMARY", ""))
+    row = {"name": summary, "title": summary}
+
+    start = event.get("DTSTART", "")
+    when = ics_datetime(start)
+    if when is not None:
+        row["date"] = when.strftime("%Y-%m-%d")
+        if "T" in start:
+            row["time"] = when.strftime("%H:%M")
+
+    rule = dict(
+        part.split("=", 1) for part in event.get("RRULE", "").split(";") if "=" in part
+    )
+    if rule:
+        row["repeat"] = rule.get("FREQ", "").lower()
+        row["interval"] = rule.get("INTERVAL", "")
+        row["count"] = rule.get("COUNT", "")
+        until = ics_datetime(rule.get("UNTIL", ""))
+        row["until"] = until.strftime("%Y-%m-%d") if until else ""
+    if event.get("EXDATE"):
+        row["except"] = " ".join(
+            d.strftime("%Y-%m-%d")
+            for value in event["EXDATE"] for d in (ics_datetime(value),) if d
+        )
+
+    # Напоминание: TRIGGER:-P3D или -P1W
+    match = re.fullmatch(r"-P(\d+)([DW])", event.get("TRIGGER", ""))
+    if match:
+        row["remind_before"] = str(int(match.group(1)) * (7 if match.group(2) == "W" else 1))
+    return row
+
+
+def read_ics_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        event = None
+        alarm = False
+        for line in unfold_ics(f):
+            name, _, value = line.partition(":")
+            name = name.split(";", 1)[0].upper()
+
+            if name == "BEGIN" and value.upper() == "VEVENT":
+                event = {}
+            elif event is None:
+                continue
+            elif name == "END" and value.upper() == "VEVENT":
+                yield ics_row(event)
+                event = None
+            elif name in ("BEGIN", "END") and value.upper() == "VALARM":
+                alarm = name == "BEGIN"
+            elif alarm:
+                if name == "TRIGGER":
+                    event.setdefault("TRIGGER", value.strip())
+            elif name == "EXDATE":
+                event.setdefault("EXDATE", []).extend(value.split(","))
+            else:
+                event.setdefault(name, value)
+
+
+def read_rows(path):
+    if path.lower().endswith(".ics"):
+        return read_ics_rows(path)
+    return read_csv_rows(path)
+
+
+# ---------- проверка и сборка ----------
+def valid_dates(records):
+    # Допустима ли дата каждой записи пачки; 29.02 — только в високосный год
+    if use_numpy(len(records)):
+        cols = ReminderColumns(records, (("year", None), ("month", None), ("day", None)))
+        return cols.dates()[1].tolist()
+
+    result = []
+    for r in records:
+        try:
+            date(r["year"], r["month"], r["day"])
+            result.append(True)
+        except (TypeError, ValueError, OverflowError):
+            result.append(False)
+    return result
+
+
+def import_records(kind, path, known, progress=None, cancelled=None):
+    # (новые записи, отчёт) — в хранилище ничего не пишет.
+    # known — отпечатки уже сохранённых записей, дополняется принятыми.
+    # None вместо записей — импорт прерван
+    make, fingerprint = IMPORT_KINDS[kind]
+    report = {"rows": 0, "added": 0, "duplicates": 0, "invalid": 0, "invalid_rows": []}
+    accepted = []
+    batch = []
+
+    def invalid(row_number):
+        report["invalid"] += 1
+        if len(report["invalid_rows"]) < IMPORT_REPORT_ERRORS:
+            report["invalid_rows"].append(row_number)
+
+    def flush():
+        for (row_number, record), ok in zip(batch, valid_dates([r for _, r in batch])):
+            if not ok or (record.get("repeat") and repeat_rule(record) is None):
+                invalid(row_number)
+                continue
+            key = fingerprint(record)
+            if key in known:
+                report["duplicates"] += 1
+                continue
+            known.add(key)
+            accepted.append(record)
+        batch.clear()
+        if progress is not None:
+            progress(report["rows"])
+
+    for row in read_rows(path):
+        report["rows"] += 1
+        record = make(row)
+        if record is None:
+            invalid(report["rows"])
+            continue
+
+        batch.append((report["rows"], record))
+        if len(batch) >= IMPORT_BATCH:
+            flush()
+            if cancelled is not None and cancelled():
+                return None, report
+    flush()
+
+    report["added"] = len(accepted)
+    report["invalid_rows"].sort()
+    return accepted, report
+
+
+# ---------- экспорт ----------
+def record_date(record):
+    return "%04d-%02d-%02d" % tuple(
+        to_int(record.get(field)) or 0 for field in ("year", "month", "day")
+    )
+
+
+def csv_row(kind, record):
+    if kind == "birthdays":
+        return [record.get("name", ""), record_date(record)]
+
+    repeat = record.get("repeat")
+    repeat = repeat if isinstance(repeat, dict) else {}
+    return [
+        record.get("title", ""),
+        record_date(record),
+        "%02d:%02d" % (to_int(record.get("hour")) or 0, to_int(record.get("minute")) or 0),
+        to_int(record.get("remind_before")) or 0,
+        repeat.get("freq", ""),
+        repeat.get("interval", ""),
+        repeat.get("until", ""),
+        repeat.get("count", ""),
+        " ".join(repeat.get("except", ())),
+    ]
+
+
+def ics_escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def ics_fold(line):
+    # Строки iCalendar — не длиннее 75 октетов
+    while len(line.encode("utf-8")) > 75:
+        cut = 74
+        while len(line[:cut].encode("utf-8")) > 74:
+            cut -= 1
+        yield line[:cut]
+        line = " " + line[cut:]
+    yield line
+
+
+def ics_lines(kind, record):
+    day = record_date(record).replace("-", "")
+    lines = ["BEGIN:VEVENT", f"UID:{record.get('id') or uuid.uuid4().hex}@pet-reminder"]
+
+    if kind == "birthdays":
+        lines += [
+            f"SUMMARY:{ics_escape(record.get('name', ''))}",
+            f"DTSTART;VALUE=DATE:{day}",
+            "RRULE:FREQ=YEARLY",
+        ]
+    else:
+        hour, minute = to_int(record.get("hour")) or 0, to_int(record.get("minute")) or 0
+        lines += [
+            f"SUMMARY:{ics_escape(record.get('title', ''))}",
+            f"DTSTART:{day}T{hour:02d}{minute:02d}00",
+        ]
+
+        repeat = record.get("repeat")
+        if isinstance(repeat, dict) and repeat.get("freq"):
+            rule = f"RRULE:FREQ={str(repeat['freq']).upper()}"
+            if repeat.get("interval"):
+                rule += f";INTERVAL={repeat['interval']}"
+            if repeat.get("until"):
+                rule += f";UNTIL={str(repeat['until']).replace('-', '')}"
+            if repeat.get("count"):
+                rule += f";COUNT={repeat['count']}"
+            lines.append(rule)
+            if repeat.get("except"):
+                lines.append("EXDATE;VALUE=DATE:" + ",".join(
+                    str(d).replace("-", "") for d in repeat["except"]
+                ))
+
+        remind_before = to_int(record.get("remind_before")) or 0
+        if remind_before > 0:
+            lines += [
+                "BEGIN:VALARM",
+                "ACTION:DISPLAY",
+                f"DESCRIPTION:{ics_escape(record.get('title', ''))}",
+                f"TRIGGER:-P{remind_before}D",
+                "END:VALARM",
+            ]
+
+    lines.append("END:VEVENT")
+    return lines
+
+
+def export_records(kind, records, path):
+    # Пишем построчно во временный файл и подменяем целиком
+    tmp_path = path + ".tmp"
+    count = 0
+
+    if path.lower().endswith(".ics"):
+        with open(tmp_path, "w", encoding="utf-8", newline="\r\n") as f:
+            f.write("BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//Pet Reminder//RU\n")
+            for record in records:
+                for line in ics_lines(kind, record):
+                    for part in ics_fold(line):
+                        f.write(part + "\n")
+                count += 1
+            f.write("END:VCALENDAR\n")
+    else:
+        # utf-8-sig — чтобы Excel узнал кодировку
+        with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+            out = csv.writer(f)
+            out.writerow(CSV_FIELDS[kind])
+            for record in records:
+                out.writerow(csv_row(kind, record))
+                count += 1
+
+    os.replace(tmp_path, path)
+    return count
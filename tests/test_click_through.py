@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Без экрана и без настоящей папки данных пользователя
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["APPDATA"] = tempfile.mkdtemp()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+import pet
+
+
+class ClickThroughTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+        cls.pet = pet.Pet()
+
+        # Кадры клика грузятся в фоне — без них анимации не будет вовсе
+        deadline = time.monotonic() + 10
+        while not cls.pet.click_frames and time.monotonic() < deadline:
+            cls.app.processEvents()
+            time.sleep(0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pet.frames.stop_loader()
+        pet.writer.flush()
+
+    def setUp(self):
+        self.pet.playing_click = False
+        self.pet.dragging = False
+
+    def find_point(self, opaque):
+        # С (0, 0) не начинаем: нулевую точку QTest заменяет центром
+        for y in range(1, self.pet.height()):
+            for x in range(1, self.pet.width()):
+                if self.pet.hit(QPoint(x, y)) == opaque:
+                    return QPoint(x, y)
+        self.skipTest("в кадре нет нужного пикселя")
+
+    def test_transparent_click_passes_through(self):
+        point = self.find_point(opaque=False)
+        QTest.mouseClick(self.pet, Qt.LeftButton, Qt.NoModifier, point)
+        self.assertFalse(self.pet.playing_click)
+        self.assertFalse(self.pet.dragging)
+
+    def test_opaque_click_plays_animation(self):
+        point = self.find_point(opaque=True)
+        QTest.mouseClick(self.pet, Qt.LeftButton, Qt.NoModifier, point)
+        self.assertTrue(self.pet.playing_click)
+
+
+if __name__ == "__main__":
+    unittest.main()
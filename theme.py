@@ -0,0 +1,110 @@
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPixmap, QPainter, QPainterPath, QColor
+from PyQt5.QtWidgets import QWidget
+
+
+# ===============================
+# ОФОРМЛЕНИЕ
+# ===============================
+# Вся таблица стилей ставится один раз на приложение и разбирается
+# один раз за процесс; окна её не задают. Селекторы привязаны к
+# objectName, поэтому питомец и меню трея стиль не задевает.
+# Скруглённый полупрозрачный фон окон и уведомлений рисуется
+# готовой картинкой из кэша, а не движком стилей.
+EDITOR_RADIUS = 20
+EDITOR_BACKGROUND = (255, 255, 255, 242)
+
+TOAST_RADIUS = 15
+TOAST_BACKGROUNDS = {
+    "birthday": (40, 40, 40, 230),
+    "event": (30, 90, 160, 230),
+}
+
+APP_STYLE = """
+    QWidget#editor QTableView {
+        background-color: white;
+        border-radius: 10px;
+        font-size: 14px;
+    }
+    QWidget#editor QPushButton {
+        background-color: #0078D7;
+        color: white;
+        border-radius: 10px;
+        padding: 6px 12px;
+    }
+    QWidget#editor QPushButton:hover {
+        background-color: #005ea6;
+    }
+    QWidget#editor QPushButton#closeButton {
+        background-color: transparent;
+        color: #444;
+        font-size: 20px;
+        font-weight: bold;
+        border-radius: 20px;
+    }
+    QWidget#editor QPushButton#closeButton:hover {
+        background-color: #e81123;
+        color: white;
+    }
+    QWidget#toast QLabel {
+        background: transparent;
+        color: white;
+        font-size: 14px;
+    }
+"""
+
+
+def install(app):
+    # Повторный вызов ничего не делает: стиль уже разобран
+    if app.property("pet_theme"):
+        return
+    app.setStyleSheet(APP_STYLE)
+    app.setProperty("pet_theme", True)
+
+
+# ===============================
+# СКРУГЛЁННЫЕ ФОНЫ
+# ===============================
+backgrounds = {}
+
+
+def rounded_background(width, height, radius, rgba, ratio=1.0):
+    key = (width, height, radius, rgba, ratio)
+    pixmap = backgrounds.get(key)
+    if pixmap is not None:
+        return pixmap
+
+    pixmap = QPixmap(round(width * ratio), round(height * ratio))
+    pixmap.setDevicePixelRatio(ratio)
+    pixmap.fill(Qt.transparent)
+
+    path = QPainterPath()
+    path.addRoundedRect(QRectF(0, 0, width, height), radius, radius)
+
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.fillPath(path, QColor(*rgba))
+    painter.end()
+
+    backgrounds[key] = pixmap
+    return pixmap
+
+
+class RoundedPanel(QWidget):
+    # Контейнер окна: фон — готовая картинка нужного размера и цвета
+    def __init__(self, radius, rgba, parent=None):
+        super().__init__(parent)
+        self.radius = radius
+        self.rgba = rgba
+
+    def set_color(self, rgba):
+        if rgba != self.rgba:
+            self.rgba = rgba
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, rounded_background(
+            self.width(), self.height(), self.radius, self.rgba,
+            self.devicePixelRatioF()
+        ))